@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""Aurora MySQL parameter groups sized for an instance class and workload.
+
+``derive`` turns an instance class's memory and a workload profile into
+server settings. ``tune`` then splits them into cluster and instance
+parameter groups and keeps only the settings the parameter group family
+accepts:
+
+* the buffer pool takes a profile-dependent share of memory, rounded down
+  to whole 128 MiB chunks;
+* ``max_connections`` is what the memory left after the buffer pool and an
+  OS/engine reserve can hold at the profile's per-connection budget;
+* per-session buffers, table cache and slow query threshold follow the
+  profile;
+* IO capacity and redo log size are derived too. Aurora doesn't accept
+  them, since its storage layer does the flushing and has no local redo
+  log, so they are only kept for ``mysql*`` families;
+* the query cache exists up to MySQL 5.7 only, so it is only set for the
+  ``*5.7`` families.
+
+Everything here is plain arithmetic and can be tested without cdktf.
+
+    python aurora_tuning.py db.r5.large [--profile oltp] [--family aurora-mysql8.0]
+"""
+from typing import Dict, List, NamedTuple
+
+GIB = 1 << 30
+MIB = 1 << 20
+BUFFER_POOL_CHUNK = 128 * MIB
+
+# Memory of the classes we use or are likely to, in GiB.
+INSTANCE_MEMORY_GIB = {
+    "db.t3.medium": 4, "db.t4g.medium": 4,
+    "db.t3.large": 8, "db.t4g.large": 8,
+    "db.r5.large": 16, "db.r5.xlarge": 32, "db.r5.2xlarge": 64, "db.r5.4xlarge": 128,
+    "db.r5.8xlarge": 256, "db.r5.12xlarge": 384, "db.r5.16xlarge": 512, "db.r5.24xlarge": 768,
+    "db.r6g.large": 16, "db.r6g.xlarge": 32, "db.r6g.2xlarge": 64, "db.r6g.4xlarge": 128,
+    "db.r6g.8xlarge": 256, "db.r6g.12xlarge": 384, "db.r6g.16xlarge": 512,
+    "db.r6i.large": 16, "db.r6i.xlarge": 32, "db.r6i.2xlarge": 64, "db.r6i.4xlarge": 128,
+    "db.r6i.8xlarge": 256, "db.r6i.12xlarge": 384, "db.r6i.16xlarge": 512, "db.r6i.24xlarge": 768,
+}
+
+
+class Profile(NamedTuple):
+    buffer_pool_share: float
+    connection_memory: int  # bytes a connection is budgeted
+    sort_buffer: int
+    join_buffer: int
+    tmp_table: int
+    table_open_cache: int
+    long_query_time: float
+    io_capacity: int
+    query_cache: bool
+    parallel_query: bool
+
+
+PROFILES = {
+    # Many short transactions: most memory to the buffer pool, small sessions.
+    "oltp": Profile(0.75, 3 * MIB, 256 * 1024, 256 * 1024, 32 * MIB, 4000, 1, 2000, False, False),
+    # Mostly repeated reads: bigger table cache, query cache where it exists.
+    "read_heavy": Profile(0.75, 4 * MIB, 512 * 1024, 512 * 1024, 64 * MIB, 8000, 2, 1000, True, False),
+    # Few long queries: room for big sorts, joins and temp tables, and
+    # parallel query on Aurora.
+    "batch": Profile(0.65, 64 * MIB, 8 * MIB, 8 * MIB, 256 * MIB, 2000, 10, 4000, False, True),
+}
+
+MIN_CONNECTIONS = 45
+MAX_CONNECTIONS = 16000
+
+# Settings that go into the cluster parameter group; everything else is
+# per instance, since it depends on the instance's memory.
+CLUSTER_PARAMETERS = {"aurora_parallel_query", "innodb_lock_wait_timeout"}
+# Parameters that need a reboot to change.
+STATIC_PARAMETERS = {"innodb_buffer_pool_size", "innodb_log_file_size"}
+AURORA_UNSUPPORTED = {"innodb_io_capacity", "innodb_io_capacity_max", "innodb_log_file_size"}
+QUERY_CACHE_PARAMETERS = {"query_cache_type", "query_cache_size"}
+
+
+class Tuning(NamedTuple):
+    cluster: Dict[str, str]
+    instance: Dict[str, str]
+    skipped: List[str]  # derived but not accepted by the family
+
+
+def memory_bytes(instance_class: str) -> int:
+    try:
+        return INSTANCE_MEMORY_GIB[instance_class] * GIB
+    except KeyError:
+        raise ValueError(f"unknown instance class {instance_class!r}; add it to INSTANCE_MEMORY_GIB") from None
+
+
+def reserve_bytes(memory: int) -> int:
+    # The OS, the engine's own structures and Aurora's agents.
+    return max(256 * MIB, int(memory * 0.06))
+
+
+def derive(instance_class: str, profile: str = "oltp") -> Dict[str, object]:
+    if profile not in PROFILES:
+        raise ValueError(f"profile must be one of {sorted(PROFILES)}, not {profile!r}")
+    settings = PROFILES[profile]
+    memory = memory_bytes(instance_class)
+    buffer_pool = int(memory * settings.buffer_pool_share) // BUFFER_POOL_CHUNK * BUFFER_POOL_CHUNK
+    free = memory - buffer_pool - reserve_bytes(memory)
+    connections = min(max(free // settings.connection_memory, MIN_CONNECTIONS), MAX_CONNECTIONS)
+    return {
+        "innodb_buffer_pool_size": buffer_pool,
+        "max_connections": connections,
+        "thread_cache_size": min(connections // 8, 256),
+        "table_open_cache": settings.table_open_cache,
+        "sort_buffer_size": settings.sort_buffer,
+        "join_buffer_size": settings.join_buffer,
+        "tmp_table_size": settings.tmp_table,
+        "max_heap_table_size": settings.tmp_table,
+        "long_query_time": settings.long_query_time,
+        "slow_query_log": 1,
+        "innodb_lock_wait_timeout": 300 if profile == "batch" else 50,
+        "innodb_io_capacity": settings.io_capacity,
+        "innodb_io_capacity_max": settings.io_capacity * 2,
+        # Enough redo to absorb a checkpoint's worth of buffer pool writes.
+        "innodb_log_file_size": min(max(buffer_pool // 8, 128 * MIB), 4 * GIB),
+        "query_cache_type": 1 if settings.query_cache else 0,
+        "query_cache_size": min(memory // 64, 256 * MIB) if settings.query_cache else 0,
+        "aurora_parallel_query": 1 if settings.parallel_query else 0,
+    }
+
+
+def accepts(family: str, name: str) -> bool:
+    aurora = family.startswith("aurora")
+    if aurora and name in AURORA_UNSUPPORTED:
+        return False
+    if name in QUERY_CACHE_PARAMETERS and not family.endswith("5.7"):
+        return False
+    return aurora or name != "aurora_parallel_query"
+
+
+def tune(instance_class: str, profile: str = "oltp", family: str = "aurora-mysql8.0") -> Tuning:
+    cluster, instance, skipped = {}, {}, []
+    for name, value in derive(instance_class, profile).items():
+        if not accepts(family, name):
+            skipped.append(name)
+            continue
+        target = cluster if name in CLUSTER_PARAMETERS and family.startswith("aurora") else instance
+        target[name] = str(value)
+    return Tuning(cluster, instance, skipped)
+
+
+def apply_method(name: str) -> str:
+    return "pending-reboot" if name in STATIC_PARAMETERS else "immediate"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="derived Aurora MySQL parameters")
+    parser.add_argument("instance_class")
+    parser.add_argument("--profile", default="oltp", choices=sorted(PROFILES))
+    parser.add_argument("--family", default="aurora-mysql8.0")
+    args = parser.parse_args()
+    tuning = tune(args.instance_class, args.profile, args.family)
+    for group, values in (("cluster", tuning.cluster), ("instance", tuning.instance)):
+        for name, value in values.items():
+            print(f"{group:<9} {name:<28} {value:>14}  {apply_method(name)}")
+    if tuning.skipped:
+        print(f"not settable in {args.family}: {', '.join(tuning.skipped)}")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""Synthesis benchmarks for ``MyStack``.
+
+Each scale factor is measured in its own spawned process, so every run gets
+a fresh jsii kernel and its own peak RSS, taken over the process and the
+kernel it starts (see ``rss``). Loading the provider's jsii assembly takes
+most of the first construction and doesn't depend on the stack, so it is
+reported as ``import_seconds`` instead of construct time. ``scale``
+multiplies the subnets, security group rules, S3 metrics and the alarms on
+those metrics in the stack. Synthesis goes through ``cdktf.Testing`` against the local
+``imports/aws`` bindings and needs no network access.
+
+    python bench.py                      compare against bench-baseline.json
+    python bench.py --update             record a new baseline
+    python bench.py --scales 1,10,100
+    python bench.py --stream             also measure stream_synth at each scale
+
+Exits non-zero when a metric regresses past its tolerance, and when there
+is no baseline to compare against (run with ``--update`` to record one).
+Per resource type, the block count may not grow and the bytes per type get
+a small tolerance, so a type that quietly doubles its output fails the run
+even when the total stays within bounds.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench-baseline.json")
+STACK_ARGS = {
+    "dbname": "benchdb",
+    "instance_class": "db.r5.large",
+    "password": "bench-password",
+    "username": "admin",
+    "master_password": "bench-master-password",
+}
+
+# Allowed growth over the baseline before a metric counts as a regression.
+# Timings also need to grow by an absolute amount, so sub-second noise on
+# small stacks doesn't fail the run.
+TOLERANCES = {
+    "import_seconds": (0.25, 0.10),
+    "construct_seconds": (0.25, 0.10),
+    "synth_seconds": (0.25, 0.10),
+    "peak_rss_kb": (0.15, 10240),
+    "output_bytes": (0.02, 1024),
+    # Per resource or data source type.
+    "resources": {
+        "count": (0.0, 0),
+        "bytes": (0.02, 256),
+    },
+}
+
+
+def _streamed(stack) -> tuple:
+    import stream_synth
+
+    with tempfile.TemporaryDirectory() as directory:
+        stream_synth.write_stack(stack, directory)
+        output_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        document = {}
+        for section, type_name, name, body in stream_synth.blocks(directory):
+            document.setdefault(section, {}).setdefault(type_name, {})[name] = body
+    return document, output_bytes
+
+
+def measure(scale: int, stream: bool = False) -> dict:
+    from cdktf import Testing
+
+    import bindings
+    import rss
+    from stack import MyStack
+
+    started = time.perf_counter()
+    app = Testing.app()
+    stack = MyStack(app, "bench", **STACK_ARGS, scale=scale)
+    constructed = time.perf_counter()
+    if stream:
+        document, output_bytes = _streamed(stack)
+    else:
+        synthesized = Testing.synth(stack)
+        document, output_bytes = json.loads(synthesized), len(synthesized)
+    finished = time.perf_counter()
+
+    resources = {}
+    for block in ("resource", "data"):
+        for type_name, items in document.get(block, {}).items():
+            key = type_name if block == "resource" else f"data.{type_name}"
+            resources[key] = {"count": len(items), "bytes": len(json.dumps(items))}
+    return {
+        "import_seconds": bindings.import_seconds(),
+        "construct_seconds": constructed - started - bindings.import_seconds(),
+        "synth_seconds": finished - constructed,
+        "peak_rss_kb": rss.tree_peak_kb(),
+        "output_bytes": output_bytes,
+        "resources": dict(sorted(resources.items())),
+    }
+
+
+def run(scales, repeat: int = 1, stream: bool = False) -> dict:
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    # Streamed runs are recorded as "<scale> stream", next to the app.synth()
+    # figures for the same scale.
+    modes = [(str(scale), scale, False) for scale in scales]
+    if stream:
+        modes = [mode for scale in scales for mode in ((str(scale), scale, False), (f"{scale} stream", scale, True))]
+    for key, scale, streamed in modes:
+        samples = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                samples.append(pool.submit(measure, scale, streamed).result())
+        # Keep the best value of each metric; the others only add scheduler
+        # noise. The fastest construct and the fastest synth are often from
+        # different samples.
+        best = dict(samples[0])
+        for metric in ("import_seconds", "construct_seconds", "synth_seconds", "peak_rss_kb"):
+            best[metric] = min(sample[metric] for sample in samples)
+        results[key] = best
+    return results
+
+
+def _grew(before: float, after: float, tolerance) -> bool:
+    relative, absolute = tolerance
+    return after > before * (1 + relative) and after - before > absolute
+
+
+def regressions(results: dict, baseline: dict) -> list:
+    found = []
+    for scale, result in results.items():
+        if scale not in baseline:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            if metric == "resources" or metric not in baseline[scale]:
+                continue
+            before, after = baseline[scale][metric], result[metric]
+            if _grew(before, after, tolerance):
+                found.append(f"scale {scale}: {metric} {before:.6g} -> {after:.6g} (+{100 * (after / before - 1):.0f}%)")
+        recorded = baseline[scale].get("resources", {})
+        for type_name, item in result["resources"].items():
+            if type_name not in recorded:
+                found.append(f"scale {scale}: new type {type_name} ({item['count']} blocks, {item['bytes']} B)")
+                continue
+            for metric, tolerance in TOLERANCES["resources"].items():
+                before, after = recorded[type_name][metric], item[metric]
+                if _grew(before, after, tolerance):
+                    found.append(f"scale {scale}: {type_name} {metric} {before} -> {after}")
+    return found
+
+
+def report(results: dict, baseline: dict, stream=sys.stdout):
+    stream.write(f"{'scale':>9} {'resources':>9} {'import':>7} {'construct':>10} {'synth':>8} {'rss MiB':>8} "
+                 f"{'output KiB':>11}\n")
+    for scale, result in results.items():
+        count = sum(item["count"] for item in result["resources"].values())
+        stream.write(f"{scale:>9} {count:>9} {result['import_seconds']:>6.2f}s {result['construct_seconds']:>9.2f}s "
+                     f"{result['synth_seconds']:>7.2f}s {result['peak_rss_kb'] / 1024:>8.0f} {result['output_bytes'] / 1024:>11.1f}\n")
+        before = baseline.get(scale, {}).get("resources", {})
+        for type_name, item in result["resources"].items():
+            previous = before.get(type_name, {}).get("bytes")
+            change = f"  ({item['bytes'] - previous:+d} B)" if previous is not None and previous != item["bytes"] else ""
+            stream.write(f"{'':>8}{type_name:<48} {item['count']:>6} x {item['bytes'] / max(item['count'], 1):>7.0f} B{change}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MyStack synthesis benchmarks")
+    parser.add_argument("--scales", default="1,10,50")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--stream", action="store_true", help="also synthesize through stream_synth.write_stack")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif not args.update:
+        parser.error(f"no baseline at {args.baseline}; run with --update to record one")
+    results = run([int(scale) for scale in args.scales.split(",")], args.repeat, args.stream)
+    report(results, baseline)
+
+    if args.update:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    found = regressions(results, baseline)
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Lazy access to the generated ``imports.aws`` bindings.
+
+``import bindings as aws`` and then ``aws.Vpc(...)`` loads ``imports.aws.vpc``
+the first time ``Vpc`` is looked up, so only the Python classes a stack
+actually creates get defined and registered with the jsii runtime.
+
+The generated ``imports/aws/__init__.py`` ends by importing every one of the
+provider's ~2000 submodules, and Python runs a package's ``__init__`` before
+any of its submodules. So ``imports.aws`` is put into ``sys.modules`` from its
+spec without running it: submodules still import normally through its
+``__path__``. The provider's jsii assembly (``imports.aws._jsii``) is loaded
+into the kernel whole either way, and is timed on its own.
+
+A value the kernel returns whose type lives in a submodule nobody looked up
+fails with "Unknown type"; look that type up here first.
+"""
+import importlib
+import importlib.util
+import re
+import sys
+import time
+
+PACKAGE = "imports.aws"
+
+# Classes whose module can't be derived from their own name: structs live in
+# the module of the resource they configure, and a few resources are renamed
+# by the code generator.
+_MODULES = {
+    "AppautoscalingPolicyTargetTrackingScalingPolicyConfiguration": "appautoscaling_policy",
+    "AppautoscalingPolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecification": "appautoscaling_policy",
+    "AwsProvider": "provider",
+    "DbParameterGroupParameter": "db_parameter_group",
+    "DataAwsIamPolicyDocumentStatement": "data_aws_iam_policy_document",
+    "DataAwsIamPolicyDocumentStatementPrincipals": "data_aws_iam_policy_document",
+    "EcrRepositoryImageScanningConfiguration": "ecr_repository",
+    "EksClusterVpcConfig": "eks_cluster",
+    "RdsClusterParameterGroupParameter": "rds_cluster_parameter_group",
+    "RouteTableRoute": "route_table",
+    "S3BucketMetricFilter": "s3_bucket_metric",
+    "S3BucketServerSideEncryptionConfigurationA": "s3_bucket_server_side_encryption_configuration",
+    "S3BucketServerSideEncryptionConfigurationRuleA": "s3_bucket_server_side_encryption_configuration",
+    "S3BucketServerSideEncryptionConfigurationRuleApplyServerSideEncryptionByDefaultA": "s3_bucket_server_side_encryption_configuration",
+}
+
+# Seconds spent importing each binding module, in load order.
+load_times = {}
+# Classes resolved so far, and callbacks run once for each newly resolved one.
+loaded = {}
+load_hooks = []
+
+
+def module_for(name: str) -> str:
+    return _MODULES.get(name) or re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _import(module_name: str):
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if module_name not in load_times:
+        load_times[module_name] = time.perf_counter() - started
+    return module
+
+
+def _package():
+    """``imports.aws``, registered without running its ``__init__``."""
+    package = sys.modules.get(PACKAGE)
+    if package is None:
+        spec = importlib.util.find_spec(PACKAGE)
+        if spec is None:
+            raise ImportError(f"no {PACKAGE} package; run 'cdktf get' first")
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = package
+        parent, _, child = PACKAGE.rpartition(".")
+        setattr(sys.modules[parent], child, package)
+        _import(f"{PACKAGE}._jsii")
+    return package
+
+
+def load(name: str):
+    _package()
+    module_name = f"{PACKAGE}.{module_for(name)}"
+    module = _import(module_name)
+    try:
+        value = getattr(module, name)
+    except AttributeError:
+        raise AttributeError(f"{module_name} has no binding named {name!r}") from None
+    globals()[name] = loaded[name] = value
+    for hook in load_hooks:
+        hook(value)
+    return value
+
+
+def import_seconds() -> float:
+    return sum(load_times.values())
+
+
+def __getattr__(name: str):
+    if not name[:1].isupper():
+        raise AttributeError(name)
+    return load(name)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""Subnet CIDR planning.
+
+``CidrAllocator`` is a buddy allocator over one network: free blocks are kept
+in one min-heap per prefix length, so an allocation pops the lowest free
+block of the closest size and splits it, which is O(log n) in the number of
+free blocks and deterministic for a given sequence of calls.
+
+``plan_subnets`` lays tiers out on top of it. Each tier gets a contiguous
+region with room for ``max_azs`` subnets, and the subnet for zone ``i`` is
+always the ``i``-th slot of its tier's region, so adding zones never moves
+an existing subnet and adding a tier at the end never moves the others.
+
+    python cidr.py --bench [--vpcs N] [--subnets N]
+"""
+import heapq
+import ipaddress
+import math
+from typing import Dict, Iterable, Tuple
+
+
+class CidrAllocator:
+    def __init__(self, block: str):
+        self.network = ipaddress.ip_network(block)
+        self._bits = self.network.max_prefixlen
+        self._heaps = {prefixlen: [] for prefixlen in range(self._bits + 1)}
+        self._free = {prefixlen: set() for prefixlen in range(self._bits + 1)}
+        self._allocated: Dict[int, int] = {}  # start -> prefixlen of every allocated or reserved block
+        self._add(self.network.prefixlen, int(self.network.network_address))
+
+    def _size(self, prefixlen: int) -> int:
+        return 1 << (self._bits - prefixlen)
+
+    def _add(self, prefixlen: int, start: int):
+        self._free[prefixlen].add(start)
+        heapq.heappush(self._heaps[prefixlen], start)
+
+    def _pop(self, prefixlen: int):
+        # Entries removed by reserve() stay in the heap until they surface.
+        heap, free = self._heaps[prefixlen], self._free[prefixlen]
+        while heap:
+            start = heapq.heappop(heap)
+            if start in free:
+                free.remove(start)
+                return start
+        return None
+
+    def _split(self, start: int, prefixlen: int, target: int):
+        # Split the free block (start, prefixlen) down to target size, keeping
+        # the lower half each time and freeing the upper one.
+        while prefixlen < target:
+            prefixlen += 1
+            self._add(prefixlen, start + self._size(prefixlen))
+
+    def _network(self, start: int, prefixlen: int):
+        return ipaddress.ip_network((start, prefixlen))
+
+    def allocate(self, prefixlen: int):
+        if not self.network.prefixlen <= prefixlen <= self._bits:
+            raise ValueError(f"/{prefixlen} does not fit in {self.network}")
+        for candidate in range(prefixlen, self.network.prefixlen - 1, -1):
+            start = self._pop(candidate)
+            if start is not None:
+                self._split(start, candidate, prefixlen)
+                self._allocated[start] = prefixlen
+                return self._network(start, prefixlen)
+        raise ValueError(f"{self.network} has no free /{prefixlen} left")
+
+    def reserve(self, cidr: str):
+        block = ipaddress.ip_network(cidr)
+        if not block.subnet_of(self.network):
+            raise ValueError(f"{block} is outside {self.network}")
+        address = int(block.network_address)
+        for prefixlen in range(block.prefixlen, self.network.prefixlen - 1, -1):
+            start = address & ~(self._size(prefixlen) - 1)
+            if start in self._free[prefixlen]:
+                self._free[prefixlen].remove(start)
+                while prefixlen < block.prefixlen:
+                    prefixlen += 1
+                    half = self._size(prefixlen)
+                    if address >= start + half:
+                        self._add(prefixlen, start)
+                        start += half
+                    else:
+                        self._add(prefixlen, start + half)
+                self._allocated[address] = block.prefixlen
+                return block
+        raise ValueError(f"{block} overlaps an allocated range of {self.network}")
+
+    def release(self, cidr: str):
+        block = ipaddress.ip_network(cidr)
+        start, prefixlen = int(block.network_address), block.prefixlen
+        if self._allocated.get(start) != prefixlen:
+            raise ValueError(f"{block} is not allocated")
+        del self._allocated[start]
+        while prefixlen > self.network.prefixlen:
+            buddy = start ^ self._size(prefixlen)
+            if buddy not in self._free[prefixlen]:
+                break
+            self._free[prefixlen].remove(buddy)
+            start, prefixlen = min(start, buddy), prefixlen - 1
+        self._add(prefixlen, start)
+
+    def free_addresses(self) -> int:
+        return sum(len(starts) * self._size(prefixlen) for prefixlen, starts in self._free.items())
+
+
+def plan_subnets(vpc_cidr: str, tiers: Dict[str, int], zones: int, max_azs: int = 8,
+                 pinned: Dict[Tuple[str, int], str] = None,
+                 allocator: CidrAllocator = None) -> Dict[Tuple[str, int], ipaddress.IPv4Network]:
+    """Map (tier, zone index) to a subnet for every tier in every zone.
+
+    ``pinned`` keeps ranges that were assigned by hand before planning; they
+    are reserved first and used as-is for their (tier, zone) slot. Pass an
+    ``allocator`` to carve further subnets from what the plan leaves free.
+    """
+    if zones > max_azs:
+        raise ValueError(f"{zones} zones exceed max_azs={max_azs}")
+    pinned = pinned or {}
+    allocator = allocator or CidrAllocator(vpc_cidr)
+    reserved = {key: allocator.reserve(cidr) for key, cidr in pinned.items()}
+    slot_bits = math.ceil(math.log2(max_azs))
+    plan = {}
+    for tier, prefixlen in tiers.items():
+        region = allocator.allocate(prefixlen - slot_bits)
+        slots = list(region.subnets(new_prefix=prefixlen))
+        for zone in range(zones):
+            plan[tier, zone] = reserved.get((tier, zone), slots[zone])
+    return plan
+
+
+def check_disjoint(cidrs: Iterable[str], within: str = None):
+    networks = sorted(ipaddress.ip_network(cidr) for cidr in cidrs)
+    for previous, current in zip(networks, networks[1:]):
+        if previous.overlaps(current):
+            raise ValueError(f"{previous} overlaps {current}")
+    if within:
+        outer = ipaddress.ip_network(within)
+        for network in networks:
+            if not network.subnet_of(outer):
+                raise ValueError(f"{network} is outside {outer}")
+
+
+def bench(vpcs: int = 500, subnets: int = 50000):
+    import random
+    import time
+
+    rng = random.Random(84)
+    allocators = [CidrAllocator(f"10.{i % 256}.0.0/16") for i in range(vpcs)]
+    sizes = [rng.choice((24, 25, 26, 27, 28)) for _ in range(subnets)]
+    started = time.perf_counter()
+    allocated = []
+    for index, prefixlen in enumerate(sizes):
+        allocator = allocators[index % vpcs]
+        allocated.append((allocator, allocator.allocate(prefixlen)))
+    allocate_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for allocator, network in allocated[::2]:
+        allocator.release(network)
+    release_seconds = time.perf_counter() - started
+    print(f"{subnets} allocations over {vpcs} VPCs: {allocate_seconds * 1e6 / subnets:.1f} us each "
+          f"({allocate_seconds:.2f}s); {len(allocated[::2])} releases: {release_seconds * 1e6 / len(allocated[::2]):.1f} us each")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CIDR allocator")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--vpcs", type=int, default=500)
+    parser.add_argument("--subnets", type=int, default=50000)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.vpcs, args.subnets)
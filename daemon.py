@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""Keep a warm process that re-synthesizes on every edit.
+
+``python main.py`` pays for a new interpreter, a new jsii kernel and every
+``imports.aws`` binding it touches on each run. This process pays for them
+once. It polls the project's ``*.py`` files and ``cdktf.json`` (plus the
+matrix file with ``--matrix``). On a change it drops the project's own
+modules from ``sys.modules``, so edits to ``stack.py``, ``layers.py`` and
+the rest take effect. It then rebuilds the stacks in a fresh ``App`` and
+copies into the outdir only the files that actually differ. The cdktf and
+binding modules stay loaded across rebuilds.
+
+Each rebuild leaves its constructs in the kernel, so restart the daemon
+now and then during a long session.
+
+    python daemon.py                      the stack from main.py
+    python daemon.py --matrix environments.json [--only GLOB]
+    python daemon.py --once               synthesize once and exit
+"""
+import argparse
+import fnmatch
+import glob
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, List
+
+from parallel_synth import Job
+from synth_cache import PROJECT_ROOT, outdir
+
+WATCHED = ("*.py", "cdktf.json")
+
+
+def snapshot(extra: List[str] = ()) -> Dict[str, int]:
+    paths = [p for pattern in WATCHED for p in glob.glob(os.path.join(PROJECT_ROOT, pattern))]
+    paths += list(extra)
+    return {path: os.stat(path).st_mtime_ns for path in sorted(paths)
+            if not path.endswith("-test.py") and os.path.exists(path)}
+
+
+def unload_project():
+    """Forget the project's top-level modules so the next import re-reads them."""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if name not in ("__main__", __name__) and path and os.path.dirname(os.path.abspath(path)) == PROJECT_ROOT:
+            del sys.modules[name]
+
+
+def main_jobs() -> List[Job]:
+    main = importlib.import_module("main")
+    return [Job("stack:MyStack", main.STACK_ID, main.STACK_ARGS)]
+
+
+def matrix_jobs(path: str, only: str = None) -> Callable[[], List[Job]]:
+    def jobs() -> List[Job]:
+        fleet = importlib.import_module("fleet")
+        environments = fleet.expand(fleet.load(path))
+        if only:
+            environments = [env for env in environments if fnmatch.fnmatch(env["stack_id"], only)]
+        return fleet.jobs(environments)
+
+    return jobs
+
+
+def _differs(source: str, target: str) -> bool:
+    if not os.path.exists(target) or os.path.getsize(source) != os.path.getsize(target):
+        return True
+    with open(source, "rb") as a, open(target, "rb") as b:
+        return a.read() != b.read()
+
+
+def synth(jobs: List[Job], out: str, stream: str = None) -> Dict[str, List[str]]:
+    """Synthesize ``jobs`` and update ``out``; returns the files changed per stack."""
+    from cdktf import App
+
+    os.makedirs(out, exist_ok=True)
+    changed = {}
+    with tempfile.TemporaryDirectory(prefix=".synth-", dir=out) as staging:
+        app = App(outdir=staging)
+        for job in jobs:
+            module, name = job.factory.split(":")
+            getattr(importlib.import_module(module), name)(app, job.stack_id, **job.kwargs)
+        if stream:
+            importlib.import_module("stream_synth").synth(app, shard=None if stream == "on" else stream)
+        else:
+            app.synth()
+
+        with open(os.path.join(staging, "manifest.json")) as f:
+            manifest = json.load(f)
+        for job in jobs:
+            entry = manifest["stacks"][job.stack_id]
+            entry["dependencies"] = list(job.dependencies)
+            source = os.path.join(staging, entry["workingDirectory"])
+            target = os.path.join(out, entry["workingDirectory"])
+            os.makedirs(target, exist_ok=True)
+            names = set(os.listdir(source))
+            # Shards from an earlier --stream mode would be read by terraform too.
+            for stale in glob.glob(os.path.join(target, "*.tf.json")):
+                if os.path.basename(stale) not in names:
+                    os.remove(stale)
+                    changed.setdefault(job.stack_id, []).append(os.path.basename(stale))
+            for name in sorted(names):
+                if os.path.isfile(os.path.join(source, name)) and _differs(os.path.join(source, name),
+                                                                           os.path.join(target, name)):
+                    shutil.copyfile(os.path.join(source, name), os.path.join(target, name))
+                    changed.setdefault(job.stack_id, []).append(name)
+
+        path = os.path.join(out, "manifest.json")
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        if _differs(os.path.join(staging, "manifest.json"), path):
+            shutil.copyfile(os.path.join(staging, "manifest.json"), path)
+    return changed
+
+
+def rebuild(jobs: Callable[[], List[Job]], out: str, stream: str = None) -> bool:
+    started = time.perf_counter()
+    unload_project()
+    try:
+        selected = jobs()
+        changed = synth(selected, out, stream)
+    except Exception:
+        traceback.print_exc()
+        sys.stderr.write("synth failed; waiting for the next change\n")
+        return False
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{stack} ({', '.join(files)})" for stack, files in changed.items()) or "no changes"
+    sys.stderr.write(f"synthesized {len(selected)} stacks in {elapsed:.2f}s: {summary}\n")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="warm synth process with watch mode")
+    parser.add_argument("--matrix", help="synthesize the fleet in this matrix file instead of main.py's stack")
+    parser.add_argument("--only", help="with --matrix, only stack IDs matching this glob")
+    parser.add_argument("--stream", choices=("on", "type", "layer"), help="write through stream_synth")
+    parser.add_argument("--out", default=outdir())
+    parser.add_argument("--interval", type=float, default=0.2, help="seconds between polls")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args(argv)
+
+    jobs = matrix_jobs(args.matrix, args.only) if args.matrix else main_jobs
+    extra = [os.path.abspath(args.matrix)] if args.matrix else []
+    seen = snapshot(extra)
+    ok = rebuild(jobs, args.out, args.stream)
+    if args.once:
+        return 0 if ok else 1
+    sys.stderr.write(f"watching {len(seen)} files, ctrl-c to stop\n")
+    try:
+        while True:
+            time.sleep(args.interval)
+            current = snapshot(extra)
+            if current != seen:
+                seen = current
+                rebuild(jobs, args.out, args.stream)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
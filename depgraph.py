@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+"""Resource dependency graph of a synthesized stack, and its critical path.
+
+Edges come from two places in ``cdk.tf.json``: references to other
+resources or data sources anywhere in a block's arguments
+(``${aws_vpc.MyVpc.id}``), and explicit ``depends_on`` entries. Each node
+takes an estimated create time from ``DURATIONS``, so the longest path
+through the graph approximates a from-scratch ``terraform apply`` with
+unlimited parallelism.
+
+The report lists, for every stack in the cdktf outdir:
+
+* the critical path, with the estimated start and finish of each node;
+* the peak number of resources in flight, and the smallest
+  ``-parallelism`` that still finishes in the critical-path time;
+* ``depends_on`` entries that are implied by another path and can go, and
+  entries that lengthen the apply, with the time they add.
+
+    python depgraph.py [cdktf.out] [--durations overrides.json] [--parallelism N]
+"""
+import argparse
+import heapq
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+import stream_synth
+
+# Rough create times, in seconds, for the resource types we use. Anything
+# missing is assumed to take DEFAULT_DURATION; data sources DATA_DURATION.
+DURATIONS = {
+    "aws_eks_cluster": 600,
+    "aws_eks_node_group": 300,
+    "aws_rds_cluster": 180,
+    "aws_rds_cluster_instance": 540,
+    "aws_rds_cluster_endpoint": 60,
+    "aws_db_instance": 480,
+    "aws_nat_gateway": 100,
+    "aws_vpc_endpoint": 90,
+    "aws_kms_key": 10,
+    "aws_s3_bucket": 5,
+    "aws_iam_role": 3,
+    "aws_iam_role_policy_attachment": 2,
+    "aws_cloudwatch_metric_alarm": 2,
+    "aws_sns_topic": 2,
+}
+DEFAULT_DURATION = 5
+DATA_DURATION = 1
+TERRAFORM_PARALLELISM = 10
+
+_REFERENCE = re.compile(r"\b((?:data\.)?[a-z][a-z0-9]*_[a-z0-9_]+\.[A-Za-z_][A-Za-z0-9_-]*)")
+
+
+class Step(NamedTuple):
+    address: str
+    start: float
+    finish: float
+
+
+def _strings(value) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+class Graph:
+    def __init__(self, durations: Dict[str, float], references: Dict[str, Set[str]],
+                 explicit: Dict[str, Set[str]]):
+        self.durations = durations
+        self.references = references
+        self.explicit = explicit
+
+    @classmethod
+    def from_synth(cls, document: dict, durations: Dict[str, float] = None) -> "Graph":
+        return cls.from_blocks(stream_synth.document_blocks(document), durations)
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[Tuple[str, str, str, dict]], durations: Dict[str, float] = None) -> "Graph":
+        """Build from ``(section, type, name, body)`` tuples, as ``stream_synth.blocks`` yields them."""
+        table = {**DURATIONS, **(durations or {})}
+        bodies = {}
+        for section, type_name, name, body in blocks:
+            prefix = "data." if section == "data" else ""
+            address = f"{prefix}{type_name}.{name}"
+            bodies[address] = body
+            default = DATA_DURATION if prefix else DEFAULT_DURATION
+            table.setdefault(address, table.get(f"{prefix}{type_name}", default))
+
+        references, explicit = {}, {}
+        for address, body in bodies.items():
+            arguments = {key: value for key, value in body.items() if key != "depends_on"}
+            references[address] = {match for text in _strings(arguments) if "${" in text
+                                   for match in _REFERENCE.findall(text)
+                                   if match in bodies and match != address}
+            explicit[address] = {entry.strip("${}") for entry in body.get("depends_on", [])} & bodies.keys()
+        return cls({address: table[address] for address in bodies}, references, explicit)
+
+    def dependencies(self, address: str) -> Set[str]:
+        return self.references[address] | self.explicit[address]
+
+    def order(self) -> List[str]:
+        waiting = {address: len(self.dependencies(address)) for address in self.durations}
+        dependents = {address: [] for address in self.durations}
+        for address in self.durations:
+            for dependency in self.dependencies(address):
+                dependents[dependency].append(address)
+        ready = sorted(address for address, count in waiting.items() if not count)
+        order = []
+        while ready:
+            address = heapq.heappop(ready)
+            order.append(address)
+            for dependent in dependents[address]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    heapq.heappush(ready, dependent)
+        if len(order) != len(waiting):
+            raise ValueError(f"dependency cycle through {sorted(a for a, c in waiting.items() if c)}")
+        return order
+
+    def schedule(self, without: Tuple[str, str] = None) -> Dict[str, Step]:
+        """Earliest start and finish of every node with unlimited parallelism."""
+        steps = {}
+        for address in self.order():
+            start = max((steps[dependency].finish for dependency in self.dependencies(address)
+                         if (address, dependency) != without), default=0.0)
+            steps[address] = Step(address, start, start + self.durations[address])
+        return steps
+
+    def critical_path(self) -> List[Step]:
+        steps = self.schedule()
+        if not steps:
+            return []
+        path = [max(steps.values(), key=lambda step: (step.finish, step.address))]
+        while True:
+            previous = [steps[dependency] for dependency in self.dependencies(path[-1].address)
+                        if steps[dependency].finish == path[-1].start]
+            if not previous:
+                return path[::-1]
+            path.append(max(previous, key=lambda step: step.address))
+
+    def length(self, without: Tuple[str, str] = None) -> float:
+        return max((step.finish for step in self.schedule(without).values()), default=0.0)
+
+    def peak_concurrency(self) -> int:
+        events = sorted((time, delta) for step in self.schedule().values() if step.finish > step.start
+                        for time, delta in ((step.start, 1), (step.finish, -1)))
+        peak = running = 0
+        for _, delta in events:
+            running += delta
+            peak = max(peak, running)
+        return peak
+
+    def makespan(self, parallelism: int) -> float:
+        """Apply time with at most ``parallelism`` nodes in flight.
+
+        Ready nodes start longest-remaining-path first, which is what a good
+        scheduler would do; Terraform's walk picks them in no particular
+        order, so treat the result as a lower bound.
+        """
+        tails = {}
+        dependents = {address: [] for address in self.durations}
+        for address in self.durations:
+            for dependency in self.dependencies(address):
+                dependents[dependency].append(address)
+        for address in reversed(self.order()):
+            tails[address] = self.durations[address] + max((tails[d] for d in dependents[address]), default=0.0)
+
+        waiting = {address: len(self.dependencies(address)) for address in self.durations}
+        ready = [(-tails[address], address) for address, count in waiting.items() if not count]
+        heapq.heapify(ready)
+        running, now = [], 0.0
+        while ready or running:
+            while ready and len(running) < parallelism:
+                _, address = heapq.heappop(ready)
+                heapq.heappush(running, (now + self.durations[address], address))
+            now, address = heapq.heappop(running)
+            for dependent in dependents[address]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    heapq.heappush(ready, (-tails[dependent], dependent))
+        return now
+
+    def useful_parallelism(self) -> int:
+        """Smallest ``-parallelism`` that still finishes in the critical-path time."""
+        target = self.length()
+        for parallelism in range(1, max(self.peak_concurrency(), 1) + 1):
+            if self.makespan(parallelism) <= target + 1e-9:
+                return parallelism
+        return max(self.peak_concurrency(), 1)
+
+    def _reachable(self, source: str, target: str, without: Tuple[str, str]) -> bool:
+        seen, stack = set(), [source]
+        while stack:
+            address = stack.pop()
+            for dependency in self.dependencies(address):
+                if (address, dependency) == without or dependency in seen:
+                    continue
+                if dependency == target:
+                    return True
+                seen.add(dependency)
+                stack.append(dependency)
+        return False
+
+    def redundant_depends_on(self) -> List[Tuple[str, str]]:
+        """Explicit edges already implied by a reference or another path."""
+        return [(address, dependency) for address in sorted(self.explicit)
+                for dependency in sorted(self.explicit[address])
+                if dependency in self.references[address] or self._reachable(address, dependency, (address, dependency))]
+
+    def serializing_depends_on(self) -> List[Tuple[str, str, float]]:
+        """Explicit edges that lengthen the apply, with the seconds each adds."""
+        redundant = set(self.redundant_depends_on())
+        length = self.length()
+        found = []
+        for address in sorted(self.explicit):
+            for dependency in sorted(self.explicit[address]):
+                if (address, dependency) not in redundant:
+                    saving = length - self.length((address, dependency))
+                    if saving > 0:
+                        found.append((address, dependency, saving))
+        return sorted(found, key=lambda item: -item[2])
+
+
+def stack_documents(outdir: str) -> Dict[str, str]:
+    with open(os.path.join(outdir, "manifest.json")) as f:
+        stacks = json.load(f)["stacks"]
+    return {name: os.path.join(outdir, entry["synthesizedStackPath"]) for name, entry in stacks.items()}
+
+
+def report(name: str, graph: Graph, parallelism: int = TERRAFORM_PARALLELISM, stream=sys.stdout):
+    path = graph.critical_path()
+    stream.write(f"{name}: {len(graph.durations)} nodes, critical path {graph.length() / 60:.1f} min\n")
+    for step in path:
+        stream.write(f"  {step.start:>7.0f}s {step.finish:>7.0f}s  {step.address}\n")
+    stream.write(f"  peak in flight {graph.peak_concurrency()}, useful -parallelism={graph.useful_parallelism()}, "
+                 f"-parallelism={parallelism} takes {graph.makespan(parallelism) / 60:.1f} min\n")
+    for address, dependency in graph.redundant_depends_on():
+        stream.write(f"  redundant depends_on: {address} -> {dependency}\n")
+    for address, dependency, saving in graph.serializing_depends_on():
+        stream.write(f"  serializing depends_on: {address} -> {dependency} (+{saving:.0f}s)\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="critical path of synthesized stacks")
+    parser.add_argument("outdir", nargs="?", default=os.environ.get("CDKTF_OUTDIR", "cdktf.out"))
+    parser.add_argument("--durations", help="JSON object of type or address -> seconds")
+    parser.add_argument("--parallelism", type=int, default=TERRAFORM_PARALLELISM)
+    args = parser.parse_args(argv)
+
+    durations = {}
+    if args.durations:
+        with open(args.durations) as f:
+            durations = json.load(f)
+    for name, path in stack_documents(args.outdir).items():
+        # Covers sharded output from stream_synth as well as plain cdk.tf.json.
+        report(name, Graph.from_blocks(stream_synth.blocks(os.path.dirname(path)), durations), args.parallelism)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
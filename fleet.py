@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Synthesize one ``MyStack`` per entry of an environment matrix.
+
+The matrix file (JSON, or YAML when PyYAML is installed) looks like::
+
+    {
+      "stack_id": "{environment}-{region}",
+      "defaults": {"dbname": "mydb", "username": "admin", "master_password": "${DB_MASTER_PASSWORD}"},
+      "matrix": {"environment": ["staging", "prod"], "region": ["us-east-1", "eu-west-1"]},
+      "include": [{"environment": "prod", "region": "us-east-1", "account_id": "123456789012"}],
+      "exclude": [{"environment": "staging", "region": "eu-west-1"}]
+    }
+
+As in a GitHub Actions matrix, ``exclude`` entries first drop the
+combinations they match; ``include`` entries then extend every remaining
+combination they match and are added as new combinations when they match
+none, so an ``include`` can add back an excluded combination. String
+values go through ``os.path.expandvars`` so credentials can come from the
+environment.
+
+Stacks are synthesized by a pool of worker processes, each recycled after
+``--batch`` stacks so a single jsii kernel never holds the whole fleet.
+
+    python fleet.py environments.json [--workers N] [--batch N] [--only GLOB]
+"""
+import argparse
+import fnmatch
+import itertools
+import json
+import os
+import sys
+import time
+from typing import List
+
+from parallel_synth import Job, synth_all
+from synth_cache import outdir
+
+# Keys forwarded to MyStack; anything else only shapes the stack ID.
+STACK_KEYS = ("dbname", "instance_class", "password", "username", "master_password", "region", "azs", "account_id", "scale",
+              "db_profile", "db_readers", "db_max_readers", "db_scale_readers_on")
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                sys.exit(f"{path}: reading YAML needs PyYAML (pipenv install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _matches(entry: dict, combination: dict, keys) -> bool:
+    return all(combination.get(key) == entry[key] for key in keys if key in entry)
+
+
+def expand(config: dict) -> List[dict]:
+    axes = config.get("matrix", {})
+    combinations = [dict(zip(axes, values)) for values in itertools.product(*axes.values())] if axes else []
+    combinations = [c for c in combinations
+                    if not any(_matches(entry, c, entry) for entry in config.get("exclude", []))]
+    for entry in config.get("include", []):
+        matched = [c for c in combinations if axes and _matches(entry, c, axes)]
+        for combination in matched:
+            combination.update(entry)
+        if not matched:
+            combinations.append(dict(entry))
+
+    template = config.get("stack_id", "{environment}-{region}")
+    environments = []
+    for combination in combinations:
+        values = {**config.get("defaults", {}), **combination}
+        values = {key: os.path.expandvars(value) if isinstance(value, str) else value for key, value in values.items()}
+        unset = [key for key, value in values.items() if isinstance(value, str) and "${" in value]
+        if unset:
+            raise ValueError(f"{combination}: unset environment variable in {', '.join(unset)}")
+        values.setdefault("stack_id", template.format(**values))
+        environments.append(values)
+    ids = [env["stack_id"] for env in environments]
+    duplicates = sorted({i for i in ids if ids.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"matrix produces duplicate stack IDs: {', '.join(duplicates)}")
+    return environments
+
+
+def jobs(environments: List[dict]) -> List[Job]:
+    return [Job("stack:MyStack", env["stack_id"], {key: env[key] for key in STACK_KEYS if key in env})
+            for env in environments]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("matrix")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=10, help="stacks per worker before it is replaced")
+    parser.add_argument("--only", help="synthesize only stack IDs matching this glob")
+    parser.add_argument("--out", default=outdir())
+    args = parser.parse_args(argv)
+
+    environments = expand(load(args.matrix))
+    if args.only:
+        environments = [env for env in environments if fnmatch.fnmatch(env["stack_id"], args.only)]
+    if not environments:
+        sys.exit("matrix selects no stacks")
+
+    started = time.perf_counter()
+
+    def progress(result, done, total):
+        rss_mib = "?" if result["kernel_rss_kb"] is None else result["kernel_rss_kb"] // 1024
+        sys.stderr.write(f"[{done}/{total}] {result['stack']:<40} {result['seconds']:6.1f}s  "
+                         f"worker {result['worker']} kernel rss {rss_mib} MiB\n")
+
+    results = synth_all(jobs(environments), args.out, workers=min(args.workers, len(environments)),
+                        tasks_per_worker=args.batch, progress=progress)
+    elapsed = time.perf_counter() - started
+    busy = sum(result["seconds"] for result in results)
+    sys.stderr.write(f"synthesized {len(results)} stacks in {elapsed:.1f}s ({busy:.1f}s of worker time)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,601 @@
+"""Building blocks of the cloud84 topology.
+
+Each function adds one layer's resources directly to ``scope`` (so logical
+IDs are the same whether the layer lives in ``MyStack`` or in its own
+``stacks.py`` stack) and takes its inputs from other layers as plain
+attribute values, which may be tokens or remote-state lookups.
+"""
+from typing import Dict, List, NamedTuple
+
+from cdktf import Fn, Token
+from constructs import Construct
+
+import aurora_tuning
+import bindings as aws
+import metrics
+from cidr import CidrAllocator, plan_subnets
+from regions import pick, zone_index
+from sg_rules import RuleSet
+
+VPC_CIDR = '10.0.0.0/16'
+SUBNET_TIERS = {"public": 24, "private": 24, "db": 24}
+# Hand-picked before subnets were planned; pinned so the live subnets keep
+# their ranges. Keys are (tier, zone index).
+PINNED_SUBNETS = {("public", 0): "10.0.3.0/24", ("private", 1): "10.0.5.0/24", ("db", 2): "10.0.1.0/24"}
+# Interface endpoints by service name, with the logical ID prefix for each.
+INTERFACE_ENDPOINTS = {"ecr.api": "EcrApi", "ecr.dkr": "EcrDkr", "sts": "Sts", "logs": "Logs", "monitoring": "Monitoring"}
+S3_METRIC_FILTER = "ExtremelyImportantRedDocuments"
+# Prefix length of the extra subnets created for scale > 1 (benchmarks).
+SCALED_SUBNET_PREFIX = 28
+AURORA_FAMILY = "aurora-mysql8.0"
+AURORA_ENGINE_VERSION = "8.0.mysql_aurora.3.02.0"
+# Target-tracking metrics for the reader pool. CPU is a percentage; the
+# connection target is a share of the instance's max_connections.
+READER_SCALING = {"cpu": ("RDSReaderAverageCPUUtilization", 60),
+                  "connections": ("RDSReaderAverageDatabaseConnections", 0.7)}
+
+
+class Network(NamedTuple):
+    vpc: object
+    public_subnet: object
+    private_subnet: object
+    db_subnet: object
+    cidr_blocks: Dict[str, str]
+    scaled_cidr_blocks: List[Dict[str, str]]
+    internet_gateway: object
+    public_route_table: object
+    private_route_table: object
+    db_route_table: object
+
+
+class Egress(NamedTuple):
+    public_subnets: Dict[int, object]  # zone index -> subnet
+    nat_gateways: Dict[int, object]
+    endpoint_security_group: object
+    endpoints: Dict[str, object]
+
+
+class Identity(NamedTuple):
+    eks_cluster: object
+    ecr: object
+
+
+class Storage(NamedTuple):
+    kms_key: object
+    bucket: object
+    metric_filter: str  # name of the first S3 request metrics configuration
+
+
+class ReaderPool(NamedTuple):
+    readers: List[object]
+    scaling_target: object
+    scaling_policy: object
+    endpoints: Dict[str, object]
+
+
+class Database(NamedTuple):
+    cluster: object
+    instance: object
+    reader_pool: ReaderPool  # None without readers
+
+
+#--------------------------------------NETWORK---------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def subnet_plan(azs: List[str], allocator: CidrAllocator = None) -> dict:
+    return plan_subnets(VPC_CIDR, SUBNET_TIERS, len(azs), pinned=PINNED_SUBNETS, allocator=allocator)
+
+
+def network(scope: Construct, azs: List[str], scale: int = 1) -> Network:
+    allocator = CidrAllocator(VPC_CIDR)
+    plan = subnet_plan(azs, allocator)
+    cidr_blocks = {tier: str(plan[tier, zone_index(azs, position)]) for position, tier in enumerate(SUBNET_TIERS)}
+
+    my_vpc = aws.Vpc(scope, 'MyVpc',
+                     cidr_block=VPC_CIDR,
+                     enable_dns_hostnames=True,
+                     enable_dns_support=True,
+                     instance_tenancy='default',
+                     tags={"Name": "E-Vpc"}
+                     )
+
+    internet_gateway = aws.InternetGateway(scope, "gw",
+                                           tags={"Name": "igw"},
+                                           vpc_id=my_vpc.id
+                                           )
+
+    public_subnet = aws.Subnet(scope, 'PublicSubnet',
+                               cidr_block=cidr_blocks["public"],
+                               availability_zone=pick(azs, 0),
+                               map_public_ip_on_launch=True,
+                               vpc_id=my_vpc.id,
+                               tags={"Name": "Public_Subnet"}
+                               )
+
+    private_subnet = aws.Subnet(scope, 'PrivateSubnet',
+                                cidr_block=cidr_blocks["private"],
+                                availability_zone=pick(azs, 1),
+                                map_public_ip_on_launch=True,
+                                vpc_id=my_vpc.id,
+                                tags={"Name": "Private_Subnet"}
+                                )
+
+    db_subnet = aws.Subnet(scope, 'DbSubnet',
+                           cidr_block=cidr_blocks["db"],
+                           availability_zone=pick(azs, 2),
+                           map_public_ip_on_launch=True,
+                           vpc_id=my_vpc.id,
+                           tags={"Name": "Database_Subnet"}
+                           )
+
+    public_route_table = aws.RouteTable(scope, 'PublicRouteTable',
+                                        vpc_id=my_vpc.id,
+                                        tags={"Name": "PRT"}
+                                        )
+
+    aws.RouteTable(scope, "PublicRoute",
+                    route=[
+                        aws.RouteTableRoute(
+                            cidr_block="0.0.0.0/0",
+                            gateway_id=internet_gateway.id
+                        )
+                    ],
+                    tags={
+                        "Name": "PublicRoute"
+                    },
+                    vpc_id=my_vpc.id
+                    )
+
+    routetableassociation = aws.RouteTableAssociation(scope, 'PublicRouteTableAssociation',
+                                                      subnet_id=public_subnet.id,
+                                                      route_table_id=public_route_table.id
+                                                      )
+
+    # The associated table; the "PublicRoute" table above isn't attached to
+    # any subnet.
+    aws.Route(scope, "PublicDefaultRoute",
+              route_table_id=public_route_table.id,
+              destination_cidr_block="0.0.0.0/0",
+              gateway_id=internet_gateway.id
+              )
+
+    # NAT gateways and VPC endpoints are added by egress().
+
+    private_route_table = aws.RouteTable(scope, 'PrivateRouteTableAssociation',
+                                         vpc_id=my_vpc.id,
+
+                                         tags={"Name": "PrivateRt"}
+                                         )
+
+    aws.RouteTableAssociation(scope, 'PrivateRouteAssociation',
+                  subnet_id=private_subnet.id,
+                  route_table_id=private_route_table.id
+                  )
+
+
+    db_route_table = aws.RouteTable(scope, 'DbRouteTable',
+                                    vpc_id=my_vpc.id,
+                                    tags={"Name": "Database_Route_Table"}
+                                    )
+
+    aws.RouteTableAssociation(scope, 'DbRouteAssociation',
+                              subnet_id=db_subnet.id,
+                              route_table_id=db_route_table.id
+                              )
+
+    # scale > 1 repeats the three subnet tiers with small subnets carved from
+    # the space the plan leaves free.
+    scaled_cidr_blocks = []
+    for copy in range(1, scale):
+        scaled = {}
+        for position, tier in enumerate(SUBNET_TIERS):
+            scaled[tier] = str(allocator.allocate(SCALED_SUBNET_PREFIX))
+            aws.Subnet(scope, f"{tier.capitalize()}Subnet{copy}",
+                       cidr_block=scaled[tier],
+                       availability_zone=azs[(copy + position) % len(azs)],
+                       vpc_id=my_vpc.id,
+                       tags={"Name": f"{tier.capitalize()}_Subnet_{copy}"}
+                       )
+        scaled_cidr_blocks.append(scaled)
+
+    return Network(my_vpc, public_subnet, private_subnet, db_subnet, cidr_blocks, scaled_cidr_blocks,
+                   internet_gateway, public_route_table, private_route_table, db_route_table)
+
+
+#--------------------------------------NAT AND VPC ENDPOINTS-------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def egress(scope: Construct, azs: List[str], network: Network, security_group_id: str, region: str) -> Egress:
+    """Per-AZ NAT for the private and db tiers, and endpoints for AWS APIs.
+
+    Each of those tiers routes 0.0.0.0/0 through a NAT gateway in its own
+    zone, placed in that zone's public subnet (from the subnet plan, created
+    here if the network layer didn't). S3 traffic from both goes through a
+    gateway endpoint instead. Image pulls (ECR API and DKR), STS and
+    CloudWatch logs and metrics go through interface endpoints in the
+    private and db subnets. Those accept 443 from vpc-sg members and from
+    both tiers' CIDRs.
+    """
+    plan = subnet_plan(azs)
+    public_zone = zone_index(azs, 0)
+    tiers = {"Private": (zone_index(azs, 1), network.private_subnet, network.private_route_table),
+             "Db": (zone_index(azs, 2), network.db_subnet, network.db_route_table)}
+
+    public_subnets = {public_zone: network.public_subnet}
+    nat_gateways = {}
+    for tier, (zone, _, route_table) in tiers.items():
+        if zone not in nat_gateways:
+            suffix = azs[zone][-1].upper()
+            if zone not in public_subnets:
+                public_subnets[zone] = aws.Subnet(scope, f"PublicSubnet{suffix}",
+                                                  cidr_block=str(plan["public", zone]),
+                                                  availability_zone=azs[zone],
+                                                  map_public_ip_on_launch=True,
+                                                  vpc_id=network.vpc.id,
+                                                  tags={"Name": f"Public_Subnet_{suffix}"}
+                                                  )
+                aws.RouteTableAssociation(scope, f"PublicRouteTableAssociation{suffix}",
+                                          subnet_id=public_subnets[zone].id,
+                                          route_table_id=network.public_route_table.id
+                                          )
+            eip = aws.Eip(scope, f"NatEip{suffix}",
+                          domain="vpc",
+                          tags={"Name": f"nat-{azs[zone]}"}
+                          )
+            nat_gateways[zone] = aws.NatGateway(scope, f"NatGateway{suffix}",
+                                                allocation_id=eip.allocation_id,
+                                                subnet_id=public_subnets[zone].id,
+                                                tags={"Name": f"nat-{azs[zone]}"},
+                                                depends_on=[network.internet_gateway]
+                                                )
+        aws.Route(scope, f"{tier}NatRoute",
+                  route_table_id=route_table.id,
+                  destination_cidr_block="0.0.0.0/0",
+                  nat_gateway_id=nat_gateways[zone].id
+                  )
+
+    endpoint_security_group = aws.SecurityGroup(scope, "EndpointSG",
+                                                name="vpc-endpoints-sg",
+                                                description="HTTPS to VPC interface endpoints",
+                                                vpc_id=network.vpc.id,
+                                                tags={"Name": "vpc-endpoints-sg"}
+                                                )
+    aws.SecurityGroupRule(scope, "SGR_ENDPOINTS_FROM_VPC_SG",
+                          security_group_id=endpoint_security_group.id,
+                          type="ingress",
+                          from_port=443,
+                          to_port=443,
+                          protocol="tcp",
+                          source_security_group_id=security_group_id
+                          )
+    (RuleSet("vpc-endpoints-sg")
+     .add("SGR_ENDPOINTS_HTTPS", "ingress", "tcp", 443, 443,
+          [network.cidr_blocks["private"], network.cidr_blocks["db"]])
+     .emit(scope, endpoint_security_group.id))
+
+    endpoints = {"s3": aws.VpcEndpoint(scope, "S3Endpoint",
+                                       vpc_id=network.vpc.id,
+                                       service_name=f"com.amazonaws.{region}.s3",
+                                       vpc_endpoint_type="Gateway",
+                                       route_table_ids=[network.private_route_table.id, network.db_route_table.id],
+                                       tags={"Name": "s3-gateway"}
+                                       )}
+    # Interface endpoints take at most one subnet per zone.
+    subnets_by_zone = {zone: subnet.id for zone, subnet, _ in reversed(list(tiers.values()))}
+    for service, name in INTERFACE_ENDPOINTS.items():
+        endpoints[service] = aws.VpcEndpoint(scope, f"{name}Endpoint",
+                                             vpc_id=network.vpc.id,
+                                             service_name=f"com.amazonaws.{region}.{service}",
+                                             vpc_endpoint_type="Interface",
+                                             private_dns_enabled=True,
+                                             subnet_ids=list(subnets_by_zone.values()),
+                                             security_group_ids=[endpoint_security_group.id],
+                                             tags={"Name": service}
+                                             )
+
+    return Egress(public_subnets, nat_gateways, endpoint_security_group, endpoints)
+
+
+#--------------------------------------SECURITY GROUP--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def security(scope: Construct, vpc_id: str, cidr_blocks: Dict[str, str], scaled_cidr_blocks: List[Dict[str, str]] = ()):
+
+    security_group = aws.SecurityGroup(scope, "SG",
+                                  name   =   "vpc-sg",
+                                  vpc_id = vpc_id,
+
+                                  tags={
+                                      "Name" : "vpc-sg"
+                                  }
+
+                                   )
+    rules = (RuleSet("vpc-sg")
+             .add("SGR_SSH", "ingress", "tcp", 22, 22, [cidr_blocks["private"]])
+             .add("SGR_HTTP", "ingress", "tcp", 80, 80, [cidr_blocks["public"]])
+             .add("SGR_MYSQL", "ingress", "tcp", 3306, 3306, [cidr_blocks["db"]]))
+    # One rule per scaled subnet, on ports distinct enough not to compact.
+    for copy, scaled in enumerate(scaled_cidr_blocks, start=1):
+        for position, tier in enumerate(SUBNET_TIERS):
+            port = 20000 + 4 * (3 * copy + position)
+            rules.add(f"SGR_{tier.upper()}_{copy}", "ingress", "tcp", port, port, [scaled[tier]])
+    rules.emit(scope, security_group.id)
+
+    return security_group
+
+
+#--------------------------------------EKS IAM---------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def identity(scope: Construct, subnet_ids: List[str]) -> Identity:
+    assume_role = aws.DataAwsIamPolicyDocument(scope, "assume_role",
+                                               statement = [aws.DataAwsIamPolicyDocumentStatement(
+                                                   actions = ["sts:AssumeRole"],
+                                                   effect  = "Allow",
+                                                   principals = [aws.DataAwsIamPolicyDocumentStatementPrincipals(
+                                                       identifiers = ["eks.amazonaws.com"],
+                                                       type        = "Service"
+                                                   )
+                                                   ]
+                                               )
+                                               ]
+                                    )
+
+    eks_role=aws.IamRole(scope, "eks_role",
+        assume_role_policy=Token.as_string(
+            Fn.jsonencode({
+                "Statement": [{
+                    "Action": "sts:AssumeRole",
+                    "Effect": "Allow",
+                    "Principal": {
+                        "Service": "eks.amazonaws.com"
+                    },
+                    "Sid": ""
+                }
+                ],
+                "Version": "2012-10-17"
+            })),
+        name="eks-cluster-role",
+        tags={
+            "Name": "eks_role"
+        }
+    )
+
+    eks_cluster_policy_attachment = aws.IamRolePolicyAttachment(scope, "e-AmazonEKSClusterPolicy",
+                            policy_arn="arn:aws:iam::aws:policy/AmazonEKSClusterPolicy",
+                            role=eks_role.name
+)
+
+    eksvpc_resource_controller_attachment = aws.IamRolePolicyAttachment(scope, "e-AmazonEKSVPCResourceController",
+                            policy_arn="arn:aws:iam::aws:policy/AmazonEKSVPCResourceController",
+                            role=eks_role.name
+    )
+
+
+    eks_cluster = aws.EksCluster(scope, "EksCluster",
+                     name="MyEksCluster",  # Provide a name for your EKS cluster
+                     role_arn=eks_role.arn,
+                     vpc_config=aws.EksClusterVpcConfig(
+                        subnet_ids=subnet_ids
+                     )
+)
+
+#--------------------------------------Creating an Amazon ECR------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+    amazon_ecr = aws.EcrRepository(scope, "AmazonEcr",
+        image_scanning_configuration=aws.EcrRepositoryImageScanningConfiguration(
+            scan_on_push=True
+        ),
+        image_tag_mutability="MUTABLE",
+        name = "platinum_ecr"
+
+)
+
+    return Identity(eks_cluster, amazon_ecr)
+
+
+#--------------------------------------STORAGE---------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def storage(scope: Construct, scale: int = 1) -> Storage:
+
+    my_key = aws.KmsKey(scope, "MyKey",
+                        deletion_window_in_days=10,
+                        description="key to encrypt bucket objects")
+
+    my_bucket = aws.S3Bucket(scope, "MyBucket",
+                 bucket="unique-hosting",
+                 tags={
+                     "Name": "Application Hosting"
+                 })
+
+    s3_bucket_encryption = aws.S3BucketServerSideEncryptionConfigurationA(
+                                                                    scope,
+                                                                    "MyBucketEncryption",
+                                                                    bucket=my_bucket.id,
+                                                                    rule=[
+                                                                        aws.S3BucketServerSideEncryptionConfigurationRuleA(
+                                                                            apply_server_side_encryption_by_default=aws.S3BucketServerSideEncryptionConfigurationRuleApplyServerSideEncryptionByDefaultA(
+                                                                                kms_master_key_id=my_key.arn,
+                                                                                sse_algorithm="aws:kms"
+                                                                            )
+                                                                        )
+                                                                    ]
+                                                                )
+    s3_access_point = aws.S3AccessPoint(scope, "S3AccessPoint",
+                                        bucket=my_bucket.id,
+                                        name="s3-access-point")
+
+    for copy in range(scale):
+        suffix = f"-{copy}" if copy else ""
+        aws.S3BucketMetric(scope, f"s3-filtered{suffix}",
+                           bucket=my_bucket.id,
+                           filter=aws.S3BucketMetricFilter(
+                               access_point=s3_access_point.arn,
+                               tags={
+                                   "class": "red",
+                                   "priority": "high"
+                               }
+                           ),
+                           name=f"{S3_METRIC_FILTER}{suffix}")
+
+    return Storage(my_key, my_bucket, S3_METRIC_FILTER)
+
+
+#--------------------------------------DATABASE--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def database(scope: Construct, azs: List[str], subnet_ids: List[str], kms_key_arn: str, username: str, master_password: str,
+             instance_class: str = "db.r5.large", profile: str = "oltp", readers: int = 2, max_readers: int = 6,
+             scale_readers_on: str = "cpu") -> Database:
+    rds_subnet_group = aws.DbSubnetGroup(scope, "RdsSubnetGroup",
+                                         name = "rds-subnet-grp",
+                                         subnet_ids = subnet_ids,
+                                         tags={
+                                             "Name": "RDS Subnet Group"
+                                         }
+                                    )
+
+    zones = [pick(azs, 0), pick(azs, 2)]
+    tuning = aurora_tuning.tune(instance_class, profile, AURORA_FAMILY)
+    aurora_cluster_parameter_group = aws.RdsClusterParameterGroup(scope, "AuroraClusterParameterGroup",
+                                                            name="aurora-cluster-parameter-group",
+                                                            family=AURORA_FAMILY,
+                                                            description="Custom parameter group for MySQL 8.0",
+                                                            parameter=[aws.RdsClusterParameterGroupParameter(
+                                                                name=name, value=value,
+                                                                apply_method=aurora_tuning.apply_method(name))
+                                                                for name, value in tuning.cluster.items()]
+                                                        )
+
+    aurora_instance_parameter_group = aws.DbParameterGroup(scope, "AuroraInstanceParameterGroup",
+                                                           name=f"aurora-instance-{profile.replace('_', '-')}-parameter-group",
+                                                           family=AURORA_FAMILY,
+                                                           description=f"{profile} settings for {instance_class}",
+                                                           parameter=[aws.DbParameterGroupParameter(
+                                                               name=name, value=value,
+                                                               apply_method=aurora_tuning.apply_method(name))
+                                                               for name, value in tuning.instance.items()]
+                                                           )
+
+    aurora_cluster =  aws.RdsCluster(scope, "AuroraCluster",
+                                cluster_identifier      = "aurora-cluster",
+                                engine                  = "aurora-mysql",
+                                engine_version          = AURORA_ENGINE_VERSION,
+                                availability_zones      = zones,
+                                database_name           = "dbname",
+                                master_username         = username,
+                                master_password         = master_password,
+                                db_cluster_parameter_group_name = aurora_cluster_parameter_group.name,
+                                db_subnet_group_name = rds_subnet_group.name,
+                                skip_final_snapshot     = True,
+                                delete_automated_backups= True,
+                                deletion_protection     = False
+
+                                                                )
+
+    aurora_instance = aws.RdsClusterInstance(scope, "AuroraInstance",
+                                        identifier = "aurora-cluster-instance",
+                                        cluster_identifier = aurora_cluster.cluster_identifier,
+                                        instance_class     = instance_class,
+                                        db_parameter_group_name = aurora_instance_parameter_group.name,
+                                        engine             = "aurora-mysql",
+                                        engine_version     = AURORA_ENGINE_VERSION,
+                                        performance_insights_enabled    = True,
+                                        performance_insights_kms_key_id = kms_key_arn,
+                                        performance_insights_retention_period=7
+
+                                        )
+
+    pool = reader_pool(scope, aurora_cluster, zones, instance_class, aurora_instance_parameter_group.name, kms_key_arn,
+                       profile, readers, max_readers, scale_readers_on) if readers else None
+    return Database(aurora_cluster, aurora_instance, pool)
+
+
+def reader_pool(scope: Construct, cluster, zones: List[str], instance_class: str, parameter_group_name: str,
+                kms_key_arn: str, profile: str = "oltp", readers: int = 2, max_readers: int = 6,
+                scale_on: str = "cpu") -> ReaderPool:
+    """Readers round-robin over ``zones``, autoscaling and custom endpoints.
+
+    Application Auto Scaling adds replicas on top of the declared ones, up to
+    ``max_readers`` in total. With two or more readers the last one serves
+    only the "analytics" endpoint and "oltp" gets every other reader,
+    including the autoscaled ones. With fewer, both endpoints span all
+    readers.
+    """
+    if scale_on not in READER_SCALING:
+        raise ValueError(f"scale_on must be one of {sorted(READER_SCALING)}, not {scale_on!r}")
+    if not 0 < readers <= max_readers:
+        raise ValueError(f"need 0 < readers <= max_readers, got {readers} and {max_readers}")
+
+    instances = [aws.RdsClusterInstance(scope, f"AuroraReader{index}",
+                                        identifier         = f"aurora-cluster-reader-{index}",
+                                        cluster_identifier = cluster.cluster_identifier,
+                                        instance_class     = instance_class,
+                                        availability_zone  = zones[index % len(zones)],
+                                        promotion_tier     = 1,
+                                        db_parameter_group_name = parameter_group_name,
+                                        engine             = "aurora-mysql",
+                                        engine_version     = AURORA_ENGINE_VERSION,
+                                        performance_insights_enabled    = True,
+                                        performance_insights_kms_key_id = kms_key_arn,
+                                        performance_insights_retention_period=7
+                                        )
+                 for index in range(readers)]
+
+    scaling_target = aws.AppautoscalingTarget(scope, "AuroraReaderScalingTarget",
+                                              service_namespace  = "rds",
+                                              scalable_dimension = "rds:cluster:ReadReplicaCount",
+                                              resource_id        = f"cluster:{cluster.cluster_identifier}",
+                                              min_capacity       = readers,
+                                              max_capacity       = max_readers,
+                                              # Registered before the declared readers exist, the
+                                              # target would add replicas of its own to reach min.
+                                              depends_on         = instances
+                                              )
+    metric, target = READER_SCALING[scale_on]
+    if scale_on == "connections":
+        target = int(aurora_tuning.derive(instance_class, profile)["max_connections"] * target)
+    scaling_policy = aws.AppautoscalingPolicy(scope, "AuroraReaderScalingPolicy",
+                                              name               = f"aurora-reader-{scale_on}",
+                                              policy_type        = "TargetTrackingScaling",
+                                              service_namespace  = scaling_target.service_namespace,
+                                              scalable_dimension = scaling_target.scalable_dimension,
+                                              resource_id        = scaling_target.resource_id,
+                                              target_tracking_scaling_policy_configuration=aws.AppautoscalingPolicyTargetTrackingScalingPolicyConfiguration(
+                                                  target_value       = target,
+                                                  scale_in_cooldown  = 300,
+                                                  scale_out_cooldown = 300,
+                                                  predefined_metric_specification=aws.AppautoscalingPolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecification(
+                                                      predefined_metric_type=metric))
+                                              )
+
+    analytics = [instance.identifier for instance in instances[-1:]] if readers >= 2 else []
+    endpoints = {
+        "analytics": aws.RdsClusterEndpoint(scope, "AuroraAnalyticsEndpoint",
+                                            cluster_identifier          = cluster.cluster_identifier,
+                                            cluster_endpoint_identifier = "analytics",
+                                            custom_endpoint_type        = "READER",
+                                            static_members              = analytics or None
+                                            ),
+        "oltp": aws.RdsClusterEndpoint(scope, "AuroraOltpEndpoint",
+                                       cluster_identifier          = cluster.cluster_identifier,
+                                       cluster_endpoint_identifier = "oltp",
+                                       custom_endpoint_type        = "READER",
+                                       excluded_members            = analytics or None
+                                       ),
+    }
+    return ReaderPool(instances, scaling_target, scaling_policy, endpoints)
+
+
+#---------------------------------------CloudWatch-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+def monitoring(scope: Construct, targets: Dict[str, object] = None, region: str = "us-east-1", scale: int = 1):
+    """Alarms, composite alarms and a dashboard from ``metrics.CATALOG``.
+
+    ``targets`` maps the catalog's dimension keys (cluster, writer, readers,
+    bucket, filter, eks) to values; rows without their targets are left out.
+    ``scale`` repeats the rows that use the ``filter`` target against each
+    S3 metrics filter copy, for the benchmarks; the other rows are emitted
+    once.
+    """
+    targets = targets or {}
+    sns_topic = aws.SnsTopic(scope, "MySnsTopic",
+                      display_name = " SNS Topic"
+                      )
+
+    metrics.emit(scope, targets, sns_topic.arn)
+    per_filter = [metric for metric in metrics.CATALOG if "filter" in metric.dimensions.values()]
+    for copy in range(1, scale if targets.get("filter") else 1):
+        suffix = f"-{copy}"
+        metrics.emit(scope, {**targets, "filter": f"{targets['filter']}{suffix}"}, sns_topic.arn, per_filter, suffix)
+    metrics.dashboard(scope, f"{scope.node.id}-performance", targets, region)
+
+    return sns_topic
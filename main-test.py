@@ -1,26 +1,465 @@
+import ipaddress
+import json
+import os
+
 import pytest
 from cdktf import Testing
 
-# The tests below are example tests, you can find more information at
-# https://cdk.tf/testing
+import aurora_tuning
+from cidr import CidrAllocator, check_disjoint, plan_subnets
+import daemon
+from depgraph import Graph
+import fleet
+import layers
+import metrics
+from sg_rules import RuleSet
+import stacks
+import stream_synth
+from stack import MyStack
+import synth_cache
+import tfdiff
+
+# More on testing cdktf stacks at https://cdk.tf/testing
 
 
 class TestMain:
 
-    def test_my_app(self):
-        assert True
+    stack = MyStack(Testing.app(), "stack", "mydb", "db.r5.large", "password", "admin", "master-password")
+    synthesized = Testing.synth(stack)
+
+    def test_keeps_hand_picked_subnets(self):
+        for cidr in ("10.0.3.0/24", "10.0.5.0/24", "10.0.1.0/24"):
+            assert Testing.to_have_resource_with_properties(self.synthesized, "aws_subnet", {"cidr_block": cidr})
+
+    def test_keeps_security_group_rule_ids(self):
+        rules = json.loads(self.synthesized)["resource"]["aws_security_group_rule"]
+        assert sorted(rule for rule in rules if not rule.startswith("SGR_ENDPOINTS")) == ["SGR_HTTP", "SGR_MYSQL", "SGR_SSH"]
+
+    def test_scale_multiplies_resources(self):
+        resources = json.loads(Testing.synth(MyStack(Testing.app(), "scaled", "mydb", "db.r5.large", "password", "admin",
+                                                     "master-password", scale=3)))["resource"]
+        # Plus the NAT subnets in zones b and c, and the two endpoint rules.
+        assert len(resources["aws_subnet"]) == 9 + 2
+        assert len(resources["aws_security_group_rule"]) == 9 + 2
+        assert len(resources["aws_s3_bucket_metric"]) == 3
+        # Only the alarms on the S3 metrics filter repeat for each copy.
+        per_filter = [metric for metric in metrics.CATALOG if "filter" in metric.dimensions.values()]
+        alarms = resources["aws_cloudwatch_metric_alarm"]
+        single = json.loads(self.synthesized)["resource"]["aws_cloudwatch_metric_alarm"]
+        assert len(alarms) == len(single) + 2 * len(per_filter)
+        assert sorted(alarm["dimensions"]["FilterId"] for alarm in alarms.values() if "FilterId" in alarm["dimensions"]) == \
+            sorted(f"{layers.S3_METRIC_FILTER}{suffix}" for suffix in ("", "-1", "-2") for _ in per_filter)
+
+    def test_private_tiers_route_through_nat_in_their_own_zone(self):
+        resources = json.loads(self.synthesized)["resource"]
+        zones = {f"${{aws_subnet.{name}.id}}": subnet["availability_zone"] for name, subnet in resources["aws_subnet"].items()}
+        nat_zones = {f"${{aws_nat_gateway.{name}.id}}": zones[nat["subnet_id"]] for name, nat in resources["aws_nat_gateway"].items()}
+        assert sorted(nat_zones.values()) == ["us-east-1b", "us-east-1c"]
+        routes = resources["aws_route"]
+        assert nat_zones[routes["PrivateNatRoute"]["nat_gateway_id"]] == "us-east-1b"
+        assert nat_zones[routes["DbNatRoute"]["nat_gateway_id"]] == "us-east-1c"
+
+    def test_adds_gateway_and_interface_endpoints(self):
+        endpoints = json.loads(self.synthesized)["resource"]["aws_vpc_endpoint"]
+        assert sorted(endpoint["service_name"] for endpoint in endpoints.values()) == [
+            f"com.amazonaws.us-east-1.{service}" for service in ("ecr.api", "ecr.dkr", "logs", "monitoring", "s3", "sts")]
+        assert endpoints["S3Endpoint"]["vpc_endpoint_type"] == "Gateway"
+        assert len(endpoints["EcrDkrEndpoint"]["subnet_ids"]) == 2
+
+    def test_alarms_keep_storage_alarm_id_and_route_through_composites(self):
+        resources = json.loads(self.synthesized)["resource"]
+        storage = resources["aws_cloudwatch_metric_alarm"]["RdsStorageAlarm"]
+        assert (storage["metric_name"], storage["threshold"]) == ("FreeLocalStorage", 2 * 1024 ** 3)
+        assert "alarm_actions" not in storage
+        composites = resources["aws_cloudwatch_composite_alarm"]
+        assert sorted(composites) == ["DatabaseHealthAlarm", "EksHealthAlarm", "StorageHealthAlarm"]
+        assert 'ALARM("Rds-Storage-Alarm")' in composites["DatabaseHealthAlarm"]["alarm_rule"]
+        assert len(resources["aws_cloudwatch_dashboard"]) == 1
 
-    #stack = TerraformStack(Testing.app(), "stack")
-    #app_abstraction = MyApplicationsAbstraction(stack, "app-abstraction")
-    #synthesized = Testing.synth(stack)
+    def test_sizes_instance_parameter_group_for_instance_class(self):
+        assert Testing.to_have_resource_with_properties(self.synthesized, "aws_rds_cluster_instance",
+                                                        {"instance_class": "db.r5.large"})
+        groups = json.loads(self.synthesized)["resource"]["aws_db_parameter_group"]
+        [group] = groups.values()
+        assert {"name": "max_connections", "value": "1037", "apply_method": "immediate"} in group["parameter"]
 
-    # def test_should_contain_container(self):
-    #    assert Testing.to_have_resource(self.synthesized, Container.TF_RESOURCE_TYPE)
+    def test_reader_pool_spreads_readers_and_splits_endpoints(self):
+        resources = json.loads(self.synthesized)["resource"]
+        readers = {name: body for name, body in resources["aws_rds_cluster_instance"].items() if name.startswith("AuroraReader")}
+        assert sorted(reader["availability_zone"] for reader in readers.values()) == ["us-east-1a", "us-east-1c"]
+        [target] = resources["aws_appautoscaling_target"].values()
+        assert (target["min_capacity"], target["max_capacity"]) == (2, 6)
+        endpoints = resources["aws_rds_cluster_endpoint"]
+        assert endpoints["AuroraAnalyticsEndpoint"]["static_members"] == endpoints["AuroraOltpEndpoint"]["excluded_members"]
+        assert len(endpoints["AuroraAnalyticsEndpoint"]["static_members"]) == 1
 
-    # def test_should_use_an_ubuntu_image(self):
-    #    assert Testing.to_have_resource_with_properties(self.synthesized, Image.TF_RESOURCE_TYPE, {
-    #        "name": "ubuntu:latest",
-    #    })
+    STREAMED_STACKS = {
+        "stack": lambda app: MyStack(app, "streamed", "mydb", "db.r5.large", "password", "admin", "master-password"),
+        # Remote state is a plain TerraformElement rendering into "data".
+        "identity": lambda app: stacks.IdentityStack(app, "streamed-identity"),
+    }
+
+    @staticmethod
+    def unique_keys(pairs):
+        assert len({key for key, _ in pairs}) == len(pairs), [key for key, _ in pairs]
+        return dict(pairs)
+
+    @pytest.mark.parametrize("shard", [None, "type", "layer"])
+    @pytest.mark.parametrize("build", sorted(STREAMED_STACKS))
+    def test_streamed_output_matches_synth(self, tmp_path, build, shard):
+        app = Testing.app()
+        stack = self.STREAMED_STACKS[build](app)
+        # Testing.synth strips the blocks' "//" metadata and nulls don't
+        # survive a trip through Python, so compare with what app.synth wrote.
+        app.synth()
+        with open(os.path.join(app.outdir, "stacks", stack.node.id, "cdk.tf.json")) as f:
+            synthesized = json.load(f)
+        expected = sorted(stream_synth.document_blocks(synthesized), key=str)
+        stream_synth.write_stack(stack, str(tmp_path), shard)
+        assert sorted(stream_synth.blocks(str(tmp_path)), key=str) == expected
+        main = json.loads((tmp_path / "cdk.tf.json").read_text(), object_pairs_hook=self.unique_keys)
+        for section in ("terraform", "provider", "output"):
+            assert main.get(section) == synthesized.get(section)
+        if build == "identity":
+            assert ("data", "terraform_remote_state") in {block[:2] for block in expected}
+        if build == "stack" and shard == "layer":
+            assert "resource.network.tf.json" in {path.name for path in tmp_path.iterdir()}
+
+    def test_layer_stacks_read_state_where_it_is_written(self):
+        app = Testing.app()
+        for job in stacks.layer_jobs("layered", "admin", "master-password"):
+            getattr(stacks, job.factory.split(":")[1])(app, job.stack_id, **job.kwargs)
+        app.synth()
+        with open(os.path.join(app.outdir, "manifest.json")) as f:
+            manifest = json.load(f)["stacks"]
+        written, read = {}, []
+        for name, entry in manifest.items():
+            with open(os.path.join(app.outdir, entry["synthesizedStackPath"])) as f:
+                document = json.load(f)
+            directory = os.path.join(app.outdir, entry["workingDirectory"])
+            written[name] = os.path.normpath(os.path.join(directory, document["terraform"]["backend"]["local"]["path"]))
+            assert os.path.dirname(written[name]) == os.path.normpath(directory)
+            for state in document.get("data", {}).get("terraform_remote_state", {}).values():
+                read.append(os.path.normpath(os.path.join(directory, state["config"]["path"])))
+        assert len(read) == 6 and set(read) <= set(written.values())
+
+    def test_warm_resynth_rewrites_only_changed_stacks(self, tmp_path):
+        jobs = [daemon.Job("stack:MyStack", "warm", {"dbname": "mydb", "instance_class": "db.r5.large", "password": "password",
+                                                     "username": "admin", "master_password": "master-password"})]
+        assert daemon.synth(jobs, str(tmp_path)) == {"warm": ["cdk.tf.json"]}
+        assert daemon.synth(jobs, str(tmp_path)) == {}
 
     # def test_check_validity(self):
     #    assert Testing.to_be_valid_terraform(Testing.full_synth(stack))
+
+
+class TestSynthCache:
+    STACKS = {"cloud84": {"dbname": "mydb"}}
+
+    @staticmethod
+    def synthesize(out, hcl=False):
+        directory = out / "stacks" / "cloud84"
+        (directory / "assets" / "lambda").mkdir(parents=True)
+        (directory / "assets" / "lambda" / "archive.zip").write_text("zip")
+        (directory / ".terraform").mkdir()
+        (directory / "terraform.cloud84.tfstate").write_text("{}")
+        name = "cdk.tf" if hcl else "cdk.tf.json"
+        (directory / name).write_text("document")
+        if hcl:
+            (directory / "metadata.json").write_text("{}")
+        else:
+            (directory / "resource.network.tf.json").write_text("shard")
+        (out / "manifest.json").write_text(json.dumps({"stacks": {"cloud84": {
+            "workingDirectory": "stacks/cloud84", "synthesizedStackPath": f"stacks/cloud84/{name}",
+            "stackMetadataPath": "stacks/cloud84/metadata.json"}}}))
+
+    @staticmethod
+    def tree(root):
+        return sorted(str(path.relative_to(root)) for path in root.rglob("*") if path.is_file())
+
+    @pytest.mark.parametrize("name, value", [("SYNTH_HCL_OUTPUT", "true"), ("CDKTF_CONTEXT_JSON", '{"env": "prod"}'),
+                                             ("CDKTF_TARGET_STACK_ID", "cloud84")])
+    def test_key_covers_synth_environment(self, name, value):
+        key = synth_cache.fingerprint(self.STACKS, env={})
+        assert synth_cache.fingerprint(self.STACKS, env={name: value}) != key
+        assert synth_cache.fingerprint(self.STACKS, env={"HOME": "/elsewhere"}) == key
+
+    def test_key_covers_stack_arguments_and_variant(self):
+        key = synth_cache.fingerprint(self.STACKS, env={})
+        assert synth_cache.fingerprint({"cloud84": {"dbname": "other"}}, env={}) != key
+        assert synth_cache.fingerprint(self.STACKS, variant="type", env={}) != key
+
+    @pytest.mark.parametrize("hcl", [False, True])
+    def test_restores_what_synth_wrote(self, tmp_path, monkeypatch, hcl):
+        monkeypatch.delenv("SYNTH_CACHE", raising=False)
+        out, cache_dir = tmp_path / "out", str(tmp_path / "cache")
+        self.synthesize(out, hcl)
+        synth_cache.SynthCache(self.STACKS, out=str(out), cache_dir=cache_dir).store()
+        assert ".tfstate" not in str(self.tree(tmp_path / "cache"))
+        # An outdir last synthesized in the other mode keeps only its state.
+        restored = tmp_path / "restored"
+        self.synthesize(restored, not hcl)
+        assert synth_cache.SynthCache(self.STACKS, out=str(restored), cache_dir=cache_dir).restore()
+        assert self.tree(restored) == self.tree(out)
+        assert synth_cache.read_stats(cache_dir)["hits"] == 1
+
+    def test_entry_missing_its_stack_document_is_a_miss(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("SYNTH_CACHE", raising=False)
+        out, cache_dir = tmp_path / "out", str(tmp_path / "cache")
+        self.synthesize(out)
+        cache = synth_cache.SynthCache(self.STACKS, out=str(out), cache_dir=cache_dir)
+        cache.store()
+        os.remove(os.path.join(cache.entry, "stacks", "cloud84", "cdk.tf.json"))
+        assert not synth_cache.SynthCache(self.STACKS, out=str(tmp_path / "restored"), cache_dir=cache_dir).restore()
+        assert synth_cache.read_stats(cache_dir)["misses"] == 1
+
+
+class TestFleetMatrix:
+    CONFIG = {
+        "stack_id": "{environment}-{region}",
+        "defaults": {"dbname": "mydb"},
+        "matrix": {"environment": ["staging", "prod"], "region": ["us-east-1", "eu-west-1"]},
+    }
+
+    def expand(self, **config):
+        return [(env["stack_id"], env.get("account_id")) for env in fleet.expand({**self.CONFIG, **config})]
+
+    def test_include_extends_matches_and_adds_the_rest(self):
+        assert self.expand(include=[{"environment": "prod", "account_id": "123"},
+                                    {"environment": "dev", "region": "us-east-1"}]) == [
+            ("staging-us-east-1", None), ("staging-eu-west-1", None), ("prod-us-east-1", "123"),
+            ("prod-eu-west-1", "123"), ("dev-us-east-1", None)]
+
+    def test_include_can_add_back_an_excluded_combination(self):
+        assert self.expand(exclude=[{"environment": "staging"}]) == [("prod-us-east-1", None), ("prod-eu-west-1", None)]
+        assert self.expand(exclude=[{"environment": "staging"}],
+                           include=[{"environment": "staging", "region": "eu-west-1", "account_id": "456"}]) == [
+            ("prod-us-east-1", None), ("prod-eu-west-1", None), ("staging-eu-west-1", "456")]
+
+    def test_rejects_duplicate_stack_ids(self):
+        with pytest.raises(ValueError, match="staging"):
+            fleet.expand({**self.CONFIG, "stack_id": "{environment}"})
+
+    def test_expands_variables_and_rejects_unset_ones(self, monkeypatch):
+        config = {**self.CONFIG, "defaults": {"master_password": "${FLEET_TEST_PASSWORD}"}}
+        monkeypatch.setenv("FLEET_TEST_PASSWORD", "from-env")
+        assert {env["master_password"] for env in fleet.expand(config)} == {"from-env"}
+        monkeypatch.delenv("FLEET_TEST_PASSWORD")
+        with pytest.raises(ValueError, match="master_password"):
+            fleet.expand(config)
+
+
+class TestCidrPlan:
+    TIERS = {"public": 24, "private": 24, "db": 24}
+    PINNED = {("public", 0): "10.0.3.0/24", ("private", 1): "10.0.5.0/24", ("db", 2): "10.0.1.0/24"}
+
+    def test_keeps_pinned_subnets(self):
+        plan = plan_subnets("10.0.0.0/16", self.TIERS, 3, pinned=self.PINNED)
+        for key, cidr in self.PINNED.items():
+            assert str(plan[key]) == cidr
+
+    def test_subnets_are_disjoint_and_inside_the_vpc(self):
+        plan = plan_subnets("10.0.0.0/16", self.TIERS, 6, pinned=self.PINNED)
+        check_disjoint([str(cidr) for cidr in plan.values()], within="10.0.0.0/16")
+
+    def test_adding_zones_does_not_move_subnets(self):
+        three = plan_subnets("10.0.0.0/16", self.TIERS, 3, pinned=self.PINNED)
+        five = plan_subnets("10.0.0.0/16", self.TIERS, 5, pinned=self.PINNED)
+        assert {key: five[key] for key in three} == three
+
+    def test_rejects_overlapping_pins(self):
+        with pytest.raises(ValueError):
+            plan_subnets("10.0.0.0/16", self.TIERS, 3, pinned={("public", 0): "10.0.0.0/23", ("db", 0): "10.0.1.0/24"})
+
+    def test_allocator_exhausts_and_coalesces(self):
+        allocator = CidrAllocator("10.0.0.0/24")
+        blocks = [allocator.allocate(26) for _ in range(4)]
+        assert blocks == list(ipaddress.ip_network("10.0.0.0/24").subnets(new_prefix=26))
+        with pytest.raises(ValueError):
+            allocator.allocate(28)
+        for block in blocks:
+            allocator.release(block)
+        assert allocator.allocate(24) == ipaddress.ip_network("10.0.0.0/24")
+
+    def test_allocator_rejects_releasing_unallocated_blocks(self):
+        allocator = CidrAllocator("10.0.0.0/16")
+        with pytest.raises(ValueError):
+            allocator.release("10.0.0.0/24")
+        block = allocator.allocate(24)
+        allocator.reserve("10.0.128.0/24")
+        with pytest.raises(ValueError):
+            allocator.release("10.0.0.0/25")
+        allocator.release(block)
+        with pytest.raises(ValueError):
+            allocator.release(block)
+        allocator.release("10.0.128.0/24")
+        assert allocator.free_addresses() == 1 << 16
+
+
+class TestRuleCompaction:
+
+    def test_leaves_distinct_rules_alone(self):
+        rules = (RuleSet()
+                 .add("SGR_SSH", "ingress", "tcp", 22, 22, ["10.0.5.0/24"])
+                 .add("SGR_HTTP", "ingress", "tcp", 80, 80, ["10.0.3.0/24"]))
+        assert [(rule.name, rule.cidr_blocks()) for rule in rules.compact()] == [
+            ("SGR_SSH", ["10.0.5.0/24"]), ("SGR_HTTP", ["10.0.3.0/24"])]
+
+    def test_merges_adjacent_cidrs_and_ports(self):
+        rules = (RuleSet()
+                 .add("b", "ingress", "tcp", 80, 80, ["10.0.0.128/25", "10.0.1.0/24"])
+                 .add("a", "ingress", "tcp", 80, 80, ["10.0.0.0/25"])
+                 .add("c", "ingress", "tcp", 81, 443, ["10.0.0.0/23"])
+                 .add("a", "ingress", "tcp", 80, 80, ["10.0.0.0/25"]))
+        [rule] = rules.compact()
+        assert (rule.name, rule.from_port, rule.to_port, rule.cidr_blocks()) == ("a", 80, 443, ["10.0.0.0/23"])
+        assert rules.report([rule]) == (4, 1, 5, 1)
+
+    def test_drops_rules_covered_by_wider_ones(self):
+        rules = (RuleSet()
+                 .add("web", "ingress", "tcp", 0, 1024, ["10.0.0.0/16"])
+                 .add("ssh", "ingress", "tcp", 22, 22, ["10.0.5.0/24"])
+                 .add("dns", "ingress", "udp", 53, 53, ["192.168.0.0/24"])
+                 .add("any", "ingress", "-1", 0, 0, ["192.168.0.0/16"])
+                 .add("out", "egress", "tcp", 22, 22, ["10.0.5.0/24"]))
+        assert [rule.name for rule in rules.compact()] == ["web", "any", "out"]
+
+    def test_treats_icmp_ports_as_type_and_code(self):
+        rules = (RuleSet()
+                 .add("unreach", "ingress", "icmp", 3, -1, ["10.0.0.0/16"])
+                 .add("echo", "ingress", "icmp", 8, -1, ["10.0.0.0/16"])
+                 .add("frag", "ingress", "icmp", 3, 4, ["10.0.5.0/24"])
+                 .add("redirect", "ingress", "icmp", 4, 0, ["10.1.0.0/16"])
+                 .add("source", "ingress", "icmp", 4, 1, ["10.1.0.0/16"]))
+        assert [(rule.name, rule.from_port, rule.to_port) for rule in rules.compact()] == [
+            ("unreach", 3, -1), ("echo", 8, -1), ("redirect", 4, 0), ("source", 4, 1)]
+
+
+class TestDependencyGraph:
+    DOCUMENT = {
+        "resource": {
+            "aws_vpc": {"MyVpc": {"cidr_block": "10.0.0.0/16"}},
+            "aws_subnet": {"Subnet": {"vpc_id": "${aws_vpc.MyVpc.id}"}},
+            "aws_rds_cluster": {"aurora-cluster": {"engine": "aurora-mysql"}},
+            "aws_rds_cluster_instance": {"AuroraInstance": {"cluster_identifier": "${aws_rds_cluster.aurora-cluster.id}"}},
+            "aws_cloudwatch_metric_alarm": {"Alarm": {"depends_on": ["aws_rds_cluster.aurora-cluster",
+                                                                     "aws_rds_cluster_instance.AuroraInstance"]}},
+        },
+    }
+
+    def test_critical_path_follows_references_and_depends_on(self):
+        graph = Graph.from_synth(self.DOCUMENT)
+        assert [step.address for step in graph.critical_path()] == [
+            "aws_rds_cluster.aurora-cluster", "aws_rds_cluster_instance.AuroraInstance",
+            "aws_cloudwatch_metric_alarm.Alarm"]
+        assert graph.length() == 180 + 540 + 2
+        assert graph.useful_parallelism() == 2
+
+    def test_flags_redundant_and_serializing_depends_on(self):
+        graph = Graph.from_synth(self.DOCUMENT)
+        assert graph.redundant_depends_on() == [("aws_cloudwatch_metric_alarm.Alarm", "aws_rds_cluster.aurora-cluster")]
+        assert graph.serializing_depends_on() == [
+            ("aws_cloudwatch_metric_alarm.Alarm", "aws_rds_cluster_instance.AuroraInstance", 2)]
+
+    def test_rejects_cycles(self):
+        graph = Graph.from_synth({"resource": {"aws_vpc": {"a": {"depends_on": ["aws_vpc.b"]},
+                                                           "b": {"depends_on": ["aws_vpc.a"]}}}})
+        with pytest.raises(ValueError):
+            graph.order()
+
+
+class TestStructuralDiff:
+    BASE = {
+        "provider": {"aws": [{"region": "us-east-1"}]},
+        "resource": {
+            "aws_vpc": {"MyVpc": {"cidr_block": "10.0.0.0/16"}},
+            "aws_subnet": {"Subnet": {"vpc_id": "${aws_vpc.MyVpc.id}", "cidr_block": "10.0.1.0/24"}},
+            "aws_eks_cluster": {"MyEksCluster": {"vpc_config": {"subnet_ids": ["${aws_subnet.Subnet.id}"]}}},
+            "aws_security_group_rule": {"SGR_SSH": {"from_port": 22, "to_port": 22}},
+        },
+    }
+
+    def snapshot(self, tmp_path, name, document):
+        path = tmp_path / f"{name}.tf.json"
+        path.write_text(json.dumps(document))
+        return tfdiff.snapshot(str(path))
+
+    def test_targets_changes_and_their_dependents(self, tmp_path):
+        new = json.loads(json.dumps(self.BASE))
+        new["resource"]["aws_subnet"]["Subnet"]["cidr_block"] = "10.0.2.0/24"
+        new["resource"]["aws_security_group_rule"] = {"SGR_HTTP": {"from_port": 80, "to_port": 80}}
+        before, after = self.snapshot(tmp_path, "old", self.BASE), self.snapshot(tmp_path, "new", new)
+        diff = tfdiff.compare(before, after)
+        assert diff == (["aws_security_group_rule.SGR_HTTP"], ["aws_security_group_rule.SGR_SSH"],
+                        {"aws_subnet.Subnet": ["cidr_block"]}, False)
+        assert tfdiff.targets(diff, after) == ["aws_eks_cluster.MyEksCluster", "aws_security_group_rule.SGR_HTTP",
+                                               "aws_security_group_rule.SGR_SSH"]
+
+    def test_provider_changes_need_a_full_plan(self, tmp_path):
+        new = {**self.BASE, "provider": {"aws": [{"region": "eu-west-1"}]}}
+        path = tmp_path / "new"
+        path.mkdir()
+        (path / "cdk.tf.json").write_text(json.dumps(new))
+        (tmp_path / "old").mkdir()
+        (tmp_path / "old" / "cdk.tf.json").write_text(json.dumps(self.BASE))
+        diff = tfdiff.compare(tfdiff.snapshot(str(tmp_path / "old")), tfdiff.snapshot(str(path)))
+        assert diff.full_plan and not diff.changed
+
+    def test_single_files_are_compared_whatever_their_name(self, tmp_path):
+        new = {**self.BASE, "provider": {"aws": [{"region": "eu-west-1"}]}}
+        assert tfdiff.compare(self.snapshot(tmp_path, "old", self.BASE), self.snapshot(tmp_path, "new", new)).full_plan
+        diff = tfdiff.compare(self.snapshot(tmp_path, "cdk", self.BASE), self.snapshot(tmp_path, "renamed", self.BASE))
+        assert not diff
+
+
+class TestAuroraTuning:
+
+    def test_buffer_pool_is_a_whole_number_of_chunks(self):
+        for instance_class in ("db.t3.medium", "db.r5.large", "db.r6g.4xlarge"):
+            for profile in aurora_tuning.PROFILES:
+                pool = aurora_tuning.derive(instance_class, profile)["innodb_buffer_pool_size"]
+                assert pool % aurora_tuning.BUFFER_POOL_CHUNK == 0
+                assert pool < aurora_tuning.memory_bytes(instance_class)
+
+    def test_connections_fit_in_memory_left_over(self):
+        values = aurora_tuning.derive("db.r5.large", "oltp")
+        assert values["innodb_buffer_pool_size"] == 12 * aurora_tuning.GIB
+        assert values["max_connections"] == 1037
+        assert aurora_tuning.derive("db.r5.large", "batch")["max_connections"] < values["max_connections"]
+        assert aurora_tuning.derive("db.t3.medium", "batch")["max_connections"] == aurora_tuning.MIN_CONNECTIONS
+
+    def test_family_filters_parameters(self):
+        aurora8 = aurora_tuning.tune("db.r5.large", "read_heavy", "aurora-mysql8.0")
+        assert "query_cache_size" in aurora8.skipped and "innodb_io_capacity" in aurora8.skipped
+        assert aurora8.cluster == {"innodb_lock_wait_timeout": "50", "aurora_parallel_query": "0"}
+        aurora57 = aurora_tuning.tune("db.r5.large", "read_heavy", "aurora-mysql5.7")
+        assert aurora57.instance["query_cache_size"] == str(256 * aurora_tuning.MIB)
+        mysql = aurora_tuning.tune("db.r5.large", "batch", "mysql8.0")
+        assert mysql.instance["innodb_io_capacity"] == "4000" and not mysql.cluster
+
+    def test_rejects_unknown_inputs(self):
+        with pytest.raises(ValueError):
+            aurora_tuning.derive("db.m1.tiny")
+        with pytest.raises(ValueError):
+            aurora_tuning.derive("db.r5.large", "analytics")
+
+
+class TestMetricCatalog:
+
+    def test_thresholds_convert_to_the_metric_unit(self):
+        by_name = {metric.name: metric for metric in metrics.CATALOG}
+        assert metrics.threshold(by_name["Aurora-Replica-Lag-Alarm"]) == 1000
+        assert metrics.threshold(by_name["Eks-Etcd-Size-Alarm"]) == 6 * 1024 ** 3
+        assert metrics.threshold(by_name["Aurora-Write-IOPS-Alarm"]) == 10000
+        assert metrics.threshold(by_name["Aurora-Commit-Latency-Alarm"]._replace(unit="Seconds")) == 0.02
+
+    def test_rejects_thresholds_in_the_wrong_unit(self):
+        metric = metrics.CATALOG[0]._replace(threshold="800 ms")
+        with pytest.raises(ValueError):
+            metrics.threshold(metric)
+
+    def test_skips_rows_without_targets(self):
+        lag = next(metric for metric in metrics.CATALOG if metric.name == "Aurora-Replica-Lag-Alarm")
+        assert metrics.dimensions(lag, {"writer": "aurora-cluster-instance"}) is None
+        assert metrics.dimensions(lag, {"writer": "aurora-cluster-instance", "readers": "READER"}) == {
+            "DBInstanceIdentifier": "aurora-cluster-instance"}
@@ -0,0 +1,207 @@
+"""Metric catalog, and the alarms and dashboard generated from it.
+
+Each ``Metric`` row names a CloudWatch metric, the unit CloudWatch reports
+it in, and a threshold written with its own unit (``"20 ms"``,
+``"2 GiB"``, ``"10000 /s"``). ``threshold`` converts it into the metric's
+unit, and refuses to compare e.g. bytes with seconds. Dimension values
+name a key of the ``targets`` passed to ``emit`` (the cluster identifier,
+the bucket name, ...); values starting with ``=`` are literals. Rows
+whose targets are missing, such as replica lag without readers, are
+skipped.
+
+``emit`` creates one ``CloudwatchMetricAlarm`` per row, and one
+``CloudwatchCompositeAlarm`` per group that goes off when any alarm in
+the group does. Only the composite alarms notify the shared topic, so a
+flapping metric and its neighbours page once. ``dashboard`` lays the
+same rows out as one row of graphs per group, with the alarm threshold
+drawn on each graph.
+"""
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+from cdktf import Fn
+
+import bindings as aws
+
+
+class Metric(NamedTuple):
+    name: str  # alarm name; the logical ID is the same without dashes
+    group: str  # composite alarm and dashboard row
+    namespace: str
+    metric_name: str
+    dimensions: Dict[str, str]
+    unit: str  # unit CloudWatch reports the metric in
+    statistic: str  # Average, Sum, Minimum, Maximum or a percentile like p99
+    comparison: str  # one of COMPARISONS
+    threshold: str
+    description: str
+    period: int = 300
+    evaluation_periods: int = 3
+    datapoints_to_alarm: int = 2
+    requires: Tuple[str, ...] = ()  # targets that must be present besides the dimensions'
+
+
+COMPARISONS = {
+    ">": "GreaterThanThreshold",
+    ">=": "GreaterThanOrEqualToThreshold",
+    "<": "LessThanThreshold",
+    "<=": "LessThanOrEqualToThreshold",
+}
+
+# Threshold suffixes, and CloudWatch units, as (dimension, factor).
+_SUFFIXES = {
+    "": ("count", 1), "/s": ("rate", 1), "%": ("percent", 1),
+    "B": ("bytes", 1), "KiB": ("bytes", 1 << 10), "MiB": ("bytes", 1 << 20), "GiB": ("bytes", 1 << 30),
+    "us": ("time", 1e-6), "ms": ("time", 1e-3), "s": ("time", 1), "min": ("time", 60),
+}
+_UNITS = {
+    "Count": ("count", 1), "Count/Second": ("rate", 1), "Percent": ("percent", 1),
+    "Bytes": ("bytes", 1), "Kilobytes": ("bytes", 1 << 10), "Megabytes": ("bytes", 1 << 20),
+    "Gigabytes": ("bytes", 1 << 30),
+    "Microseconds": ("time", 1e-6), "Milliseconds": ("time", 1e-3), "Seconds": ("time", 1),
+}
+
+CATALOG = [
+    # Aurora. The cluster volume grows on its own; what runs out is the
+    # instance's local storage for temporary tables and logs.
+    Metric("Rds-Storage-Alarm", "database", "AWS/RDS", "FreeLocalStorage", {"DBInstanceIdentifier": "writer"},
+           "Bytes", "Minimum", "<", "2 GiB", "Writer is running out of local storage"),
+    Metric("Aurora-Commit-Latency-Alarm", "database", "AWS/RDS", "CommitLatency",
+           {"DBClusterIdentifier": "cluster", "Role": "=WRITER"}, "Milliseconds", "Average", ">", "20 ms",
+           "Commits on the writer are slow"),
+    Metric("Aurora-Select-Latency-Alarm", "database", "AWS/RDS", "SelectLatency",
+           {"DBClusterIdentifier": "cluster", "Role": "=READER"}, "Milliseconds", "Average", ">", "50 ms",
+           "Reads on the reader pool are slow", requires=("readers",)),
+    Metric("Aurora-Write-IOPS-Alarm", "database", "AWS/RDS", "WriteIOPS", {"DBInstanceIdentifier": "writer"},
+           "Count/Second", "Average", ">", "10000 /s", "Writer write IOPS are unusually high"),
+    Metric("Aurora-Read-IOPS-Alarm", "database", "AWS/RDS", "ReadIOPS", {"DBInstanceIdentifier": "writer"},
+           "Count/Second", "Average", ">", "10000 /s", "Writer read IOPS are high; reads may belong on the readers"),
+    Metric("Aurora-Replica-Lag-Alarm", "database", "AWS/RDS", "AuroraReplicaLagMaximum",
+           {"DBInstanceIdentifier": "writer"}, "Milliseconds", "Maximum", ">", "1 s",
+           "Readers are serving stale data", period=60, evaluation_periods=5, datapoints_to_alarm=3,
+           requires=("readers",)),
+    # S3 request metrics, from the bucket's metrics configuration.
+    Metric("S3-5xx-Errors-Alarm", "storage", "AWS/S3", "5xxErrors", {"BucketName": "bucket", "FilterId": "filter"},
+           "Count", "Sum", ">=", "5", "S3 is failing requests"),
+    Metric("S3-4xx-Errors-Alarm", "storage", "AWS/S3", "4xxErrors", {"BucketName": "bucket", "FilterId": "filter"},
+           "Count", "Sum", ">=", "100", "Clients are getting S3 request errors"),
+    Metric("S3-First-Byte-Latency-Alarm", "storage", "AWS/S3", "FirstByteLatency",
+           {"BucketName": "bucket", "FilterId": "filter"}, "Milliseconds", "p99", ">", "200 ms",
+           "S3 reads are slow to start"),
+    # EKS control plane.
+    Metric("Eks-Api-5xx-Alarm", "eks", "AWS/EKS", "apiserver_request_total_5XX", {"ClusterName": "eks"},
+           "Count", "Sum", ">", "10", "The API server is failing requests"),
+    Metric("Eks-Api-Latency-Alarm", "eks", "AWS/EKS", "apiserver_request_duration_seconds_GET_P99",
+           {"ClusterName": "eks"}, "Seconds", "Maximum", ">", "1 s", "API server reads are slow"),
+    Metric("Eks-Etcd-Size-Alarm", "eks", "AWS/EKS", "apiserver_storage_size_bytes", {"ClusterName": "eks"},
+           "Bytes", "Maximum", ">", "6 GiB", "etcd is nearing its 8 GiB limit", evaluation_periods=1,
+           datapoints_to_alarm=1),
+    Metric("Eks-Pending-Pods-Alarm", "eks", "AWS/EKS", "scheduler_pending_pods", {"ClusterName": "eks"},
+           "Count", "Maximum", ">", "20", "Pods are waiting for capacity", evaluation_periods=6,
+           datapoints_to_alarm=4),
+]
+
+
+class Monitoring(NamedTuple):
+    alarms: Dict[str, List[object]]  # group -> alarms
+    composites: Dict[str, object]
+    skipped: List[str]
+
+
+def threshold(metric: Metric) -> float:
+    match = re.fullmatch(r"\s*([0-9.]+)\s*(\S*)\s*", metric.threshold)
+    if not match or match.group(2) not in _SUFFIXES:
+        raise ValueError(f"{metric.name}: can't read threshold {metric.threshold!r}")
+    if metric.unit not in _UNITS:
+        raise ValueError(f"{metric.name}: unknown CloudWatch unit {metric.unit!r}")
+    (have, factor), (want, unit_factor) = _SUFFIXES[match.group(2)], _UNITS[metric.unit]
+    if have != want:
+        raise ValueError(f"{metric.name}: threshold {metric.threshold!r} is {have}, but {metric.metric_name} is {want}")
+    return round(float(match.group(1)) * factor / unit_factor, 9)
+
+
+def dimensions(metric: Metric, targets: Dict[str, object]) -> Dict[str, object]:
+    """Resolved dimensions, or None when a target the row needs is missing."""
+    if any(targets.get(key) is None for key in metric.requires):
+        return None
+    resolved = {}
+    for name, value in metric.dimensions.items():
+        if value.startswith("="):
+            resolved[name] = value[1:]
+        elif targets.get(value) is None:
+            return None
+        else:
+            resolved[name] = targets[value]
+    return resolved
+
+
+def emit(scope, targets: Dict[str, object], topic_arn: str, catalog: List[Metric] = CATALOG, suffix: str = "") -> Monitoring:
+    alarms, skipped = {}, []
+    for metric in catalog:
+        resolved = dimensions(metric, targets)
+        if resolved is None:
+            skipped.append(metric.name)
+            continue
+        percentile = re.fullmatch(r"p\d+(\.\d+)?", metric.statistic)
+        alarms.setdefault(metric.group, []).append(
+            aws.CloudwatchMetricAlarm(scope, f"{metric.name.replace('-', '')}{suffix}",
+                                      alarm_name          = f"{metric.name}{suffix}",
+                                      alarm_description   = metric.description,
+                                      comparison_operator = COMPARISONS[metric.comparison],
+                                      namespace           = metric.namespace,
+                                      metric_name         = metric.metric_name,
+                                      dimensions          = resolved,
+                                      evaluation_periods  = metric.evaluation_periods,
+                                      threshold           = threshold(metric),
+                                      period              = metric.period,
+                                      statistic           = None if percentile else metric.statistic,
+                                      extended_statistic  = metric.statistic if percentile else None,
+                                      datapoints_to_alarm = metric.datapoints_to_alarm,
+                                      treat_missing_data  = "missing"
+                                      ))
+
+    composites = {}
+    for group, members in alarms.items():
+        names = [f"{metric.name}{suffix}" for metric in catalog if metric.group == group and metric.name not in skipped]
+        composites[group] = aws.CloudwatchCompositeAlarm(scope, f"{group.capitalize()}HealthAlarm{suffix}",
+                                                         alarm_name        = f"{group.capitalize()}-Health{suffix}",
+                                                         alarm_description = f"Any {group} alarm",
+                                                         alarm_rule        = " OR ".join(f'ALARM("{name}")' for name in names),
+                                                         alarm_actions     = [topic_arn],
+                                                         ok_actions        = [topic_arn],
+                                                         # The rule names its members, it doesn't reference them.
+                                                         depends_on        = members
+                                                         )
+    return Monitoring(alarms, composites, skipped)
+
+
+def dashboard(scope, name: str, targets: Dict[str, object], region: str, catalog: List[Metric] = CATALOG):
+    widgets, y = [], 0
+    groups = []
+    for metric in catalog:
+        if metric.group not in groups:
+            groups.append(metric.group)
+    for group in groups:
+        rows = [(metric, dimensions(metric, targets)) for metric in catalog if metric.group == group]
+        rows = [(metric, resolved) for metric, resolved in rows if resolved is not None]
+        if not rows:
+            continue
+        widgets.append({"type": "text", "x": 0, "y": y, "width": 24, "height": 1,
+                        "properties": {"markdown": f"## {group}"}})
+        y += 1
+        for index, (metric, resolved) in enumerate(rows):
+            flat = [item for pair in resolved.items() for item in pair]
+            widgets.append({"type": "metric", "x": 8 * (index % 3), "y": y + 6 * (index // 3), "width": 8, "height": 6,
+                            "properties": {
+                                "title": metric.description,
+                                "region": region,
+                                "period": metric.period,
+                                "stat": metric.statistic,
+                                "metrics": [[metric.namespace, metric.metric_name, *flat]],
+                                "annotations": {"horizontal": [{"label": metric.name, "value": threshold(metric)}]},
+                            }})
+        y += 6 * ((len(rows) + 2) // 3)
+    return aws.CloudwatchDashboard(scope, "PerformanceDashboard",
+                                   dashboard_name = name,
+                                   dashboard_body = Fn.jsonencode({"widgets": widgets})
+                                   )
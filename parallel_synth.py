@@ -0,0 +1,87 @@
+"""Synthesize stacks in worker processes and merge them into one outdir.
+
+Each job builds its stack in a fresh ``App`` inside a worker, so every
+worker has its own jsii kernel. Workers are spawned rather than forked: a
+forked child would share the parent's kernel pipes if the parent had
+already imported cdktf. The parent only merges the per-stack manifest
+entries into ``manifest.json``. Each result carries the peak RSS of its
+worker's kernel so far, which is where the constructs' memory goes.
+"""
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, NamedTuple, Tuple
+
+import rss
+
+
+class Job(NamedTuple):
+    factory: str  # "module:StackClass"
+    stack_id: str
+    kwargs: dict
+    dependencies: Tuple[str, ...] = ()
+
+
+def synth_job(job: Job, outdir: str) -> dict:
+    from cdktf import App
+
+    module, name = job.factory.split(":")
+    stack_class = getattr(importlib.import_module(module), name)
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix=".synth-", dir=outdir) as staging:
+        app = App(outdir=staging)
+        stack_class(app, job.stack_id, **job.kwargs)
+        app.synth()
+        with open(os.path.join(staging, "manifest.json")) as f:
+            manifest = json.load(f)
+        entry = manifest["stacks"][job.stack_id]
+        entry["dependencies"] = list(job.dependencies)
+        publish(staging, outdir, entry["workingDirectory"])
+    return {"stack": job.stack_id, "version": manifest["version"], "entry": entry, "seconds": time.perf_counter() - started,
+            "worker": os.getpid(), "kernel_rss_kb": rss.kernel_peak_kb()}
+
+
+def publish(staging: str, outdir: str, working_directory: str):
+    # Copy file by file so .terraform/ and state files already in the target
+    # working directory survive.
+    source = os.path.join(staging, working_directory)
+    target = os.path.join(outdir, working_directory)
+    os.makedirs(target, exist_ok=True)
+    for name in os.listdir(source):
+        path = os.path.join(source, name)
+        if os.path.isdir(path):
+            shutil.copytree(path, os.path.join(target, name), dirs_exist_ok=True)
+        else:
+            shutil.copyfile(path, os.path.join(target, name))
+
+
+def write_manifest(outdir: str, results: List[dict]):
+    manifest = {
+        "version": results[0]["version"] if results else "",
+        "stacks": {result["stack"]: result["entry"] for result in results},
+    }
+    with open(os.path.join(outdir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def synth_all(jobs: List[Job], outdir: str, workers: int = None, tasks_per_worker: int = None,
+              progress: Callable[[dict, int, int], None] = None) -> List[dict]:
+    os.makedirs(outdir, exist_ok=True)
+    order = {job.stack_id: index for index, job in enumerate(jobs)}
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=tasks_per_worker) as pool:
+        futures = [pool.submit(synth_job, job, outdir) for job in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress:
+                progress(results[-1], len(results), len(jobs))
+    results.sort(key=lambda result: order[result["stack"]])
+    write_manifest(outdir, results)
+    return results
@@ -0,0 +1,217 @@
+"""Opt-in profiling of stack construction and synthesis.
+
+``Profiler.install()`` wraps the jsii kernel entry points (``jsii.create``,
+``jsii.get``, ``jsii.invoke``, ``jsii.sinvoke``, ...) and the ``__init__`` of
+every binding class resolved through ``bindings``, plus ``TerraformStack``.
+Each construct is identified by its path (``cloud84/MyVpc``). Kernel calls
+made while it is being built, or on it afterwards (``my_vpc.id``), are
+charged to it. Static calls made outside any constructor, such as
+``Fn.jsonencode`` or ``Token.as_string`` building an argument, are charged to
+``(stack code)``.
+
+``app.synth()`` is a single kernel call that resolves the whole stack, so
+it can't be broken down per construct. Passing ``Profiler.element`` to
+``stream_synth.synth`` instead charges each element's resolution (tokens
+such as a ``Fn.jsonencode`` policy included) to that element, under the
+``synth`` phase. Streaming makes several kernel calls per element, so the
+synth total is about 3-4x what ``app.synth()`` takes; compare elements with
+each other rather than with an ``app.synth()`` run.
+
+Two outputs:
+
+* ``write_report`` - constructs and resource types sorted by time, with
+  jsii call counts;
+* ``write_collapsed`` - one ``phase;stack;construct (Type);jsii.call value``
+  line per stack, in microseconds, for flamegraph.pl or speedscope.
+
+main.py turns it on with ``CDKTF_PROFILE=<prefix>``, which synthesizes
+that way and writes ``<prefix>.txt`` and ``<prefix>.folded``.
+"""
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import bindings
+
+KERNEL_CALLS = ("create", "delete", "get", "set", "invoke", "sget", "sset", "sinvoke")
+UNATTRIBUTED = "(stack code)"
+
+
+class _Stat:
+    __slots__ = ("kind", "count", "seconds", "jsii_calls", "jsii_seconds")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.count = 0
+        self.seconds = 0.0
+        self.jsii_calls = 0
+        self.jsii_seconds = 0.0
+
+
+class Profiler:
+    def __init__(self):
+        self.phase = "construct"
+        self.constructs = {}
+        self.types = {}
+        self.collapsed = Counter()
+        self._frames = []
+        self._owners = {}
+        self._restore = []
+
+    # -- installation -----------------------------------------------------
+
+    def install(self):
+        import jsii
+        from cdktf import TerraformStack
+
+        for name in KERNEL_CALLS:
+            if hasattr(jsii, name):
+                self._patch(jsii, name, self._wrap_kernel(name, getattr(jsii, name)))
+        self._wrap_class(TerraformStack)
+        for cls in bindings.loaded.values():
+            self._wrap_class(cls)
+        bindings.load_hooks.append(self._wrap_class)
+        return self
+
+    def uninstall(self):
+        if self._wrap_class in bindings.load_hooks:
+            bindings.load_hooks.remove(self._wrap_class)
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        self._restore.clear()
+
+    def _patch(self, owner, name, replacement):
+        self._restore.append((owner, name, owner.__dict__[name] if name in owner.__dict__ else getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    @contextmanager
+    def phase_of(self, name: str):
+        previous, self.phase = self.phase, name
+        try:
+            yield self
+        finally:
+            self.phase = previous
+
+    # -- accounting -------------------------------------------------------
+
+    def _stat(self, label: str, kind: str) -> _Stat:
+        stat = self.constructs.get(label)
+        if stat is None:
+            stat = self.constructs[label] = _Stat("-" if label == UNATTRIBUTED else kind)
+        return stat
+
+    def _path(self, label: str, kind: str) -> str:
+        return ";".join([self.phase, *label.split("/")[:-1], f"{label.rsplit('/', 1)[-1]} ({self._stat(label, kind).kind})"])
+
+    def _wrap_kernel(self, name, original):
+        def call(*args, **kwargs):
+            if self._frames:
+                label, kind = self._frames[-1]
+            else:
+                label, kind = self._owners.get(id(args[0]) if args else None, (UNATTRIBUTED, "-"))
+            if name.startswith("s") and len(args) > 1:
+                detail = f"jsii.{name} {getattr(args[0], '__name__', args[0])}.{args[1]}"
+            elif name in ("get", "set", "invoke") and len(args) > 1:
+                detail = f"jsii.{name} {args[1]}"
+            else:
+                detail = f"jsii.{name}"
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                stat = self._stat(label, kind)
+                stat.jsii_calls += 1
+                stat.jsii_seconds += elapsed
+                if not self._frames:
+                    stat.seconds += elapsed
+                    self._type(kind).seconds += elapsed
+                self._type(kind).jsii_calls += 1
+                self._type(kind).jsii_seconds += elapsed
+                self.collapsed[f"{self._path(label, kind)};{detail}"] += elapsed
+
+        return call
+
+    def _type(self, kind: str) -> _Stat:
+        stat = self.types.get(kind)
+        if stat is None:
+            stat = self.types[kind] = _Stat(kind)
+        return stat
+
+    def _wrap_class(self, cls):
+        original = cls.__dict__.get("__init__")
+        if original is None or getattr(original, "__profiled__", False):
+            return
+        profiler = self
+
+        def __init__(obj, *args, **kwargs):
+            kind = cls.__name__
+            if len(args) >= 2 and isinstance(args[1], str):
+                scope = profiler._owners.get(id(args[0]), (None, None))[0]
+                label = f"{scope}/{args[1]}" if scope else args[1]
+            elif profiler._frames:
+                # Structs and other non-construct objects belong to whatever
+                # is being built around them.
+                label = profiler._frames[-1][0]
+            else:
+                label = UNATTRIBUTED
+            with profiler._frame(label, kind, count=True):
+                original(obj, *args, **kwargs)
+                if len(args) >= 2 and isinstance(args[1], str):
+                    # Constructs stay alive in the tree, so their id() can't
+                    # be reused for another object during the run.
+                    profiler._owners[id(obj)] = (label, kind)
+
+        __init__.__profiled__ = True
+        __init__.__wrapped__ = original
+        self._patch(cls, "__init__", __init__)
+
+    @contextmanager
+    def _frame(self, label: str, kind: str, count: bool = False):
+        self._frames.append((label, kind))
+        started = time.perf_counter()
+        jsii_before = self._stat(label, kind).jsii_seconds
+        try:
+            yield
+        finally:
+            self._frames.pop()
+            elapsed = time.perf_counter() - started
+            if not self._frames:
+                stat = self._stat(label, kind)
+                stat.count += count
+                stat.seconds += elapsed
+                self._type(kind).count += count
+                self._type(kind).seconds += elapsed
+                python = elapsed - (stat.jsii_seconds - jsii_before)
+                self.collapsed[f"{self._path(label, kind)};python"] += max(python, 0.0)
+
+    def element(self, element):
+        """Charge the kernel calls made while one element is synthesized to it.
+
+        For ``stream_synth.write_stack(..., each=profiler.element)``.
+        """
+        owner = self._owners.get(id(element))
+        label, kind = owner if owner else (element.node.path, type(element).__name__)
+        return self._frame(label, kind)
+
+    # -- output -----------------------------------------------------------
+
+    def write_report(self, stream=sys.stdout, limit: int = 40):
+        def table(title, rows):
+            stream.write(f"{title:<56} {'n':>5} {'total ms':>10} {'jsii calls':>10} {'jsii ms':>10}\n")
+            for name, stat in rows[:limit]:
+                stream.write(f"{name[:56]:<56} {stat.count:>5} {stat.seconds * 1000:>10.2f} "
+                             f"{stat.jsii_calls:>10} {stat.jsii_seconds * 1000:>10.2f}\n")
+            stream.write("\n")
+
+        by_time = lambda item: (-item[1].seconds, item[0])
+        table("resource type", sorted(self.types.items(), key=by_time))
+        table("construct", sorted(((f"{label} ({stat.kind})", stat) for label, stat in self.constructs.items()),
+                                  key=by_time))
+
+    def write_collapsed(self, stream):
+        for path, seconds in sorted(self.collapsed.items()):
+            micros = round(seconds * 1e6)
+            if micros:
+                stream.write(f"{path} {micros}\n")
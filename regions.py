@@ -0,0 +1,25 @@
+from typing import List
+
+# Zone letters to use where "a", "b" and "c" aren't all available to new
+# accounts. Everything else gets the first three letters.
+_ZONE_LETTERS = {
+    "us-west-1": "bc",
+    "ap-northeast-1": "acd",
+    "ap-northeast-3": "abc",
+    "ca-central-1": "abd",
+}
+
+
+def availability_zones(region: str) -> List[str]:
+    return [region + letter for letter in _ZONE_LETTERS.get(region, "abc")]
+
+
+def zone_index(azs: List[str], tier: int) -> int:
+    # Spreads tiers over the zones of the region: with three zones public,
+    # private and db land in a, b and c; with two, the db tier shares the
+    # private tier's zone so the database subnet group still spans two.
+    return min(tier, len(azs) - 1)
+
+
+def pick(azs: List[str], tier: int) -> str:
+    return azs[zone_index(azs, tier)]
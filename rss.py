@@ -0,0 +1,62 @@
+"""Resident memory of a process and of the jsii kernel it started.
+
+cdktf constructs live in the jsii kernel: a ``node jsii-runtime.js`` child of
+the Python process, which runs the actual kernel (``program.js``) in a child
+of its own. ``resource.getrusage(RUSAGE_SELF)`` only covers Python, a small
+share of the total, and ``RUSAGE_CHILDREN`` only counts processes already
+reaped. So the peaks here come from each process's ``VmHWM`` in
+``/proc/<pid>/status``, which the kernel keeps for the process's lifetime.
+
+Summing per-process peaks can overstate the peak of the sum a little; the
+kernel dwarfs the other processes, so in practice it is the kernel's peak.
+Linux only: elsewhere the functions return ``None``.
+"""
+import glob
+import os
+from typing import List, Optional
+
+
+def _parent(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name is in parentheses and may contain spaces.
+            return int(f.read().rsplit(")", 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def descendants(pid: int = None) -> List[int]:
+    pid = pid or os.getpid()
+    children = {}
+    for path in glob.glob("/proc/[0-9]*"):
+        child = int(os.path.basename(path))
+        children.setdefault(_parent(child), []).append(child)
+    found, pending = [], [pid]
+    while pending:
+        for child in children.get(pending.pop(), ()):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def peak_kb(pids: List[int]) -> Optional[int]:
+    if not os.path.isdir("/proc/self"):
+        return None
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next((int(line.split()[1]) for line in f if line.startswith("VmHWM:")), 0)
+        except OSError:
+            pass  # exited since it was listed
+    return total
+
+
+def kernel_peak_kb() -> Optional[int]:
+    """Peak RSS of the processes this one started: the jsii kernel."""
+    return peak_kb(descendants())
+
+
+def tree_peak_kb() -> Optional[int]:
+    """Peak RSS of this process and the jsii kernel together."""
+    return peak_kb([os.getpid(), *descendants()])
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""Security group rule sets with a compaction pass.
+
+Rules are collected with ``RuleSet.add`` and only turned into
+``SecurityGroupRule`` resources by ``RuleSet.emit``, after ``compact``
+rewrites them into a smaller equivalent set:
+
+* CIDRs of rules with the same direction, protocol and ports are merged
+  with a sorted-interval sweep and re-summarized into minimal prefixes;
+* rules with the same direction, protocol and CIDRs get their overlapping
+  or adjacent port ranges collapsed;
+* rules fully covered by a wider rule (more ports, a superset of CIDRs, or
+  protocol "-1") are dropped.
+
+For ICMP, ``from_port`` and ``to_port`` are the ICMP type and code, not a
+range. Those rules are never collapsed, and only cover rules with the same
+type and code, or with -1 in place of either.
+
+The first two steps repeat until nothing changes. Each emitted rule keeps
+the alphabetically first name of the rules merged into it, so a rule that
+merges with nothing keeps its logical ID.
+
+    python sg_rules.py --bench [--rules N]
+"""
+import heapq
+import ipaddress
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import bindings as aws
+
+ALL = "-1"
+_PROTOCOLS = {"all": ALL, "6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6"}
+_TYPED = {"icmp", "icmpv6"}  # from_port and to_port are type and code
+
+
+class Rule(NamedTuple):
+    names: Tuple[str, ...]
+    type: str
+    protocol: str
+    from_port: int
+    to_port: int
+    cidrs: Tuple[Tuple[int, int], ...]  # merged, sorted (first, last) address intervals
+    version: int
+
+    @property
+    def name(self) -> str:
+        return self.names[0]
+
+    def cidr_blocks(self) -> List[str]:
+        address = ipaddress.IPv4Address if self.version == 4 else ipaddress.IPv6Address
+        blocks = []
+        for first, last in self.cidrs:
+            blocks.extend(str(network) for network in ipaddress.summarize_address_range(address(first), address(last)))
+        return blocks
+
+    def entries(self) -> int:
+        return len(self.cidr_blocks())
+
+
+class Report(NamedTuple):
+    rules_before: int
+    rules_after: int
+    entries_before: int
+    entries_after: int
+
+    def __str__(self):
+        return (f"{self.rules_before} rules ({self.entries_before} entries) -> "
+                f"{self.rules_after} rules ({self.entries_after} entries)")
+
+
+def merge_intervals(intervals: Iterable[Tuple[int, int]]) -> Tuple[Tuple[int, int], ...]:
+    merged = []
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return tuple(merged)
+
+
+def _covers(outer: Tuple[Tuple[int, int], ...], inner: Tuple[Tuple[int, int], ...]) -> bool:
+    # Both sides are merged and sorted, so one forward walk is enough.
+    index = 0
+    for first, last in inner:
+        while index < len(outer) and outer[index][1] < first:
+            index += 1
+        if index == len(outer) or outer[index][0] > first or outer[index][1] < last:
+            return False
+    return True
+
+
+def _merge_cidrs(rules: List[Rule]) -> List[Rule]:
+    groups: Dict[tuple, List[Rule]] = {}
+    for rule in rules:
+        groups.setdefault((rule.type, rule.protocol, rule.from_port, rule.to_port, rule.version), []).append(rule)
+    merged = []
+    for group in groups.values():
+        first = group[0]
+        merged.append(first._replace(names=tuple(sorted({n for r in group for n in r.names})),
+                                     cidrs=merge_intervals(c for r in group for c in r.cidrs)))
+    return merged
+
+
+def _merge_ports(rules: List[Rule]) -> List[Rule]:
+    groups: Dict[tuple, List[Rule]] = {}
+    for rule in rules:
+        groups.setdefault((rule.type, rule.protocol, rule.cidrs, rule.version), []).append(rule)
+    merged = []
+    for group in groups.values():
+        if group[0].protocol in _TYPED:
+            merged.extend(group)
+            continue
+        if group[0].protocol == ALL:
+            merged.append(group[0]._replace(names=tuple(sorted({n for r in group for n in r.names}))))
+            continue
+        group.sort(key=lambda rule: (rule.from_port, rule.to_port))
+        current = group[0]
+        for rule in group[1:]:
+            if rule.from_port <= current.to_port + 1:
+                current = current._replace(to_port=max(current.to_port, rule.to_port),
+                                           names=tuple(sorted(set(current.names) | set(rule.names))))
+            else:
+                merged.append(current)
+                current = rule
+        merged.append(current)
+    return merged
+
+
+def _drop_covered(rules: List[Rule]) -> List[Rule]:
+    # Rules are only compared within their direction, version and protocol,
+    # plus protocol "-1". Merging leaves at most one "-1" rule per direction
+    # and version, and a sweep by port keeps the other comparisons to rules
+    # whose ports overlap.
+    groups: Dict[tuple, Dict[str, List[Rule]]] = {}
+    for rule in rules:
+        groups.setdefault((rule.type, rule.version), {}).setdefault(rule.protocol, []).append(rule)
+    kept = []
+    for protocols in groups.values():
+        wide = _sweep(protocols.pop(ALL, []), [])
+        kept.extend(wide)
+        for protocol, group in protocols.items():
+            kept.extend(_keep_typed(group, wide) if protocol in _TYPED else _sweep(group, wide))
+    return kept
+
+
+def _sweep(rules: List[Rule], wide: List[Rule]) -> List[Rule]:
+    kept, active = [], []  # active: heap of (to_port, index) of kept rules still in reach
+    for rule in sorted(rules, key=lambda rule: (rule.from_port, -rule.to_port, rule.names)):
+        while active and active[0][0] < rule.from_port:
+            heapq.heappop(active)
+        if any(_covers(other.cidrs, rule.cidrs) for other in wide):
+            continue
+        if any(to_port >= rule.to_port and _covers(kept[index].cidrs, rule.cidrs) for to_port, index in active):
+            continue
+        heapq.heappush(active, (rule.to_port, len(kept)))
+        kept.append(rule)
+    return kept
+
+
+def _keep_typed(rules: List[Rule], wide: List[Rule]) -> List[Rule]:
+    # -1 sorts first, so a wildcard is kept before the rules it covers.
+    kept: Dict[Tuple[int, int], List[Rule]] = {}
+    for rule in sorted(rules, key=lambda rule: (rule.from_port, rule.to_port, rule.names)):
+        if any(_covers(other.cidrs, rule.cidrs) for other in wide):
+            continue
+        keys = {(icmp_type, code) for icmp_type in (-1, rule.from_port) for code in (-1, rule.to_port)}
+        if not any(_covers(other.cidrs, rule.cidrs) for key in keys for other in kept.get(key, ())):
+            kept.setdefault((rule.from_port, rule.to_port), []).append(rule)
+    return [rule for group in kept.values() for rule in group]
+
+
+class RuleSet:
+    def __init__(self, security_group_name: str = "security group"):
+        self.security_group_name = security_group_name
+        self.rules: List[Rule] = []
+
+    def add(self, name: str, type: str, protocol: str, from_port: int, to_port: int, cidr_blocks: List[str]):
+        protocol = _PROTOCOLS.get(str(protocol).lower(), str(protocol).lower())
+        if protocol == ALL:
+            from_port = to_port = 0
+        by_version: Dict[int, list] = {}
+        for block in cidr_blocks:
+            network = ipaddress.ip_network(block, strict=False)
+            by_version.setdefault(network.version, []).append(
+                (int(network.network_address), int(network.broadcast_address)))
+        for version, intervals in sorted(by_version.items()):
+            suffix = "" if version == 4 or 4 not in by_version else "_v6"
+            self.rules.append(Rule((name + suffix,), type, protocol, int(from_port), int(to_port),
+                                   merge_intervals(intervals), version))
+        return self
+
+    def compact(self) -> List[Rule]:
+        order = {}
+        for index, rule in enumerate(self.rules):
+            for name in rule.names:
+                order.setdefault(name, index)
+        rules = list(self.rules)
+        while True:
+            merged = _merge_ports(_merge_cidrs(rules))
+            if len(merged) == len(rules) and set(merged) == set(rules):
+                break
+            rules = merged
+        rules = _drop_covered(rules)
+        return sorted(rules, key=lambda rule: order[rule.name])
+
+    def report(self, compacted: List[Rule]) -> Report:
+        return Report(len(self.rules), len(compacted),
+                      sum(rule.entries() for rule in self.rules), sum(rule.entries() for rule in compacted))
+
+    def emit(self, scope, security_group_id: str) -> Report:
+        compacted = self.compact()
+        for rule in compacted:
+            blocks = {"cidr_blocks" if rule.version == 4 else "ipv6_cidr_blocks": rule.cidr_blocks()}
+            aws.SecurityGroupRule(scope, rule.name,
+                                  security_group_id = security_group_id,
+                                  type        = rule.type,
+                                  from_port   = rule.from_port,
+                                  to_port     = rule.to_port,
+                                  protocol    = rule.protocol,
+                                  **blocks
+                                  )
+        report = self.report(compacted)
+        if report.rules_after < report.rules_before:
+            sys.stderr.write(f"{self.security_group_name}: {report}\n")
+        return report
+
+
+def bench(count: int = 5000):
+    import random
+    import time
+
+    rng = random.Random(84)
+    rules = RuleSet()
+    ports = [22, 80, 443, 3306, 5432, 6379, 8080, 8081, 8082, 8443]
+    for index in range(count):
+        # Half the rules share a few common ports and merge; the rest are
+        # unique ports on small ranges and survive compaction.
+        if index % 2:
+            port, prefixlen = rng.choice(ports), rng.choice((24, 26, 28, 32))
+        else:
+            port, prefixlen = 1024 + index, 28
+        network = ipaddress.ip_network((rng.randrange(1 << 16) << 16 | rng.randrange(1 << 16), prefixlen), strict=False)
+        rules.add(f"rule{index}", "ingress", "tcp", port, port, [str(network)])
+    started = time.perf_counter()
+    compacted = rules.compact()
+    print(f"compacted {rules.report(compacted)} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="security group rule compaction")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--rules", type=int, default=5000)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.rules)
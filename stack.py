@@ -0,0 +1,44 @@
+from typing import List
+
+from constructs import Construct
+from cdktf import TerraformStack
+
+import bindings as aws
+import layers
+from regions import availability_zones
+
+
+class MyStack(TerraformStack):
+    def __init__(self, scope: Construct, id: str, dbname: str, instance_class: str, password: str, username: str, master_password: str,
+                 region: str = "us-east-1", azs: List[str] = None, account_id: str = None, scale: int = 1,
+                 db_profile: str = "oltp", db_readers: int = 2, db_max_readers: int = 6, db_scale_readers_on: str = "cpu"):
+        super().__init__(scope, id)
+        azs = azs or availability_zones(region)
+        # Top-level construct id -> layer, for stream_synth's per-layer shards.
+        self.layer_of = {}
+
+#------------------------------INFRASTRUCTUTRE STACK---------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------#
+
+        aws.AwsProvider(self, 'Aws', region=region, allowed_account_ids=[account_id] if account_id else None)
+
+        network = self._layer(layers.network, azs, scale)
+        security_group = self._layer(layers.security, network.vpc.id, network.cidr_blocks, network.scaled_cidr_blocks)
+        self._layer(layers.egress, azs, network, security_group.id, region)
+        identity = self._layer(layers.identity, [network.private_subnet.id, network.public_subnet.id])
+        storage = self._layer(layers.storage, scale)
+        database = self._layer(layers.database, azs, [network.public_subnet.id, network.db_subnet.id], storage.kms_key.arn, username, master_password,
+                               instance_class, db_profile, db_readers, db_max_readers, db_scale_readers_on)
+        self._layer(layers.monitoring, {"cluster": database.cluster.cluster_identifier,
+                                        "writer": database.instance.identifier,
+                                        "readers": "READER" if database.reader_pool else None,
+                                        "bucket": storage.bucket.bucket,
+                                        "filter": storage.metric_filter,
+                                        "eks": identity.eks_cluster.name},
+                    region, scale)
+
+    def _layer(self, build, *args, **kwargs):
+        before = len(self.node.children)
+        result = build(self, *args, **kwargs)
+        for child in self.node.children[before:]:
+            self.layer_of[child.node.id] = build.__name__
+        return result
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""``MyStack`` split into one Terraform stack per layer.
+
+Every stack exports its attributes as outputs and reads the layers it builds
+on through their local state files, so each one synthesizes without the
+others and ``python stacks.py`` synthesizes all of them concurrently. State
+lives in each stack's working directory (``stacks/<id>`` in the outdir),
+next to the files ``parallel_synth.publish`` leaves in place.
+The manifest still records the deploy order through ``dependencies``.
+"""
+import os
+import posixpath
+import sys
+
+from cdktf import DataTerraformRemoteStateLocal, LocalBackend, TerraformOutput, TerraformStack
+from constructs import Construct
+
+import bindings as aws
+import layers
+from regions import availability_zones
+from parallel_synth import Job, synth_all
+from synth_cache import outdir
+
+
+def state_path(stack_id: str, seen_from: str) -> str:
+    """``stack_id``'s state file, relative to ``seen_from``'s working directory."""
+    return posixpath.relpath(f"stacks/{stack_id}/terraform.{stack_id}.tfstate", f"stacks/{seen_from}")
+
+
+class LayerStack(TerraformStack):
+    LAYER = None
+    DEPENDS_ON = ()
+
+    def __init__(self, scope: Construct, id: str, region: str = "us-east-1"):
+        super().__init__(scope, id)
+        # Stacks of one deployment are named "<prefix>-<layer>".
+        self.prefix = id[:-len(self.LAYER) - 1]
+        LocalBackend(self, path=state_path(id, id))
+        aws.AwsProvider(self, 'Aws', region=region)
+
+    def export(self, **values):
+        for name, value in values.items():
+            TerraformOutput(self, name, value=value)
+
+    def remote(self, layer: str):
+        stack_id = f"{self.prefix}-{layer}"
+        return DataTerraformRemoteStateLocal(self, f"{layer}-state",
+                                             path=state_path(stack_id, self.node.id))
+
+
+class NetworkStack(LayerStack):
+    LAYER = "network"
+
+    def __init__(self, scope: Construct, id: str, region: str = "us-east-1"):
+        super().__init__(scope, id, region)
+        azs = availability_zones(region)
+        network = layers.network(self, azs)
+        security_group = layers.security(self, network.vpc.id, network.cidr_blocks)
+        layers.egress(self, azs, network, security_group.id, region)
+        self.export(vpc_id=network.vpc.id,
+                    public_subnet_id=network.public_subnet.id,
+                    private_subnet_id=network.private_subnet.id,
+                    db_subnet_id=network.db_subnet.id,
+                    security_group_id=security_group.id)
+
+
+class IdentityStack(LayerStack):
+    LAYER = "identity"
+    DEPENDS_ON = ("network",)
+
+    def __init__(self, scope: Construct, id: str, region: str = "us-east-1"):
+        super().__init__(scope, id, region)
+        network = self.remote("network")
+        identity = layers.identity(self, [network.get_string("private_subnet_id"), network.get_string("public_subnet_id")])
+        self.export(eks_cluster_name=identity.eks_cluster.name,
+                    ecr_repository_url=identity.ecr.repository_url)
+
+
+class StorageStack(LayerStack):
+    LAYER = "storage"
+
+    def __init__(self, scope: Construct, id: str, region: str = "us-east-1"):
+        super().__init__(scope, id, region)
+        storage = layers.storage(self)
+        self.export(kms_key_arn=storage.kms_key.arn,
+                    bucket_id=storage.bucket.id)
+
+
+class DatabaseStack(LayerStack):
+    LAYER = "database"
+    DEPENDS_ON = ("network", "storage")
+
+    def __init__(self, scope: Construct, id: str, username: str, master_password: str, region: str = "us-east-1",
+                 instance_class: str = "db.r5.large", db_profile: str = "oltp", db_readers: int = 2, db_max_readers: int = 6,
+                 db_scale_readers_on: str = "cpu"):
+        super().__init__(scope, id, region)
+        network = self.remote("network")
+        storage = self.remote("storage")
+        database = layers.database(self, availability_zones(region), [network.get_string("public_subnet_id"), network.get_string("db_subnet_id")],
+                                   storage.get_string("kms_key_arn"), username, master_password, instance_class, db_profile,
+                                   db_readers, db_max_readers, db_scale_readers_on)
+        endpoints = database.reader_pool.endpoints if database.reader_pool else {}
+        self.export(cluster_identifier=database.cluster.cluster_identifier,
+                    instance_identifier=database.instance.identifier,
+                    **{f"{name}_endpoint": endpoint.endpoint for name, endpoint in endpoints.items()})
+
+
+class MonitoringStack(LayerStack):
+    LAYER = "monitoring"
+    DEPENDS_ON = ("identity", "storage", "database")
+
+    def __init__(self, scope: Construct, id: str, region: str = "us-east-1", db_readers: int = 2):
+        super().__init__(scope, id, region)
+        identity = self.remote("identity")
+        storage = self.remote("storage")
+        database = self.remote("database")
+        layers.monitoring(self, {"cluster": database.get_string("cluster_identifier"),
+                                 "writer": database.get_string("instance_identifier"),
+                                 "readers": "READER" if db_readers else None,
+                                 "bucket": storage.get_string("bucket_id"),
+                                 "filter": layers.S3_METRIC_FILTER,
+                                 "eks": identity.get_string("eks_cluster_name")},
+                          region)
+
+
+LAYER_STACKS = (NetworkStack, IdentityStack, StorageStack, DatabaseStack, MonitoringStack)
+
+
+def layer_jobs(prefix: str, username: str, master_password: str, region: str = "us-east-1",
+               instance_class: str = "db.r5.large", db_profile: str = "oltp", db_readers: int = 2, db_max_readers: int = 6,
+               db_scale_readers_on: str = "cpu", **_) -> list:
+    jobs = []
+    for stack_class in LAYER_STACKS:
+        kwargs = {"region": region}
+        if stack_class is MonitoringStack:
+            kwargs.update(db_readers=db_readers)
+        if stack_class is DatabaseStack:
+            kwargs.update(username=username, master_password=master_password, instance_class=instance_class,
+                          db_profile=db_profile, db_readers=db_readers, db_max_readers=db_max_readers,
+                          db_scale_readers_on=db_scale_readers_on)
+        jobs.append(Job(f"stacks:{stack_class.__name__}", f"{prefix}-{stack_class.LAYER}", kwargs,
+                        tuple(f"{prefix}-{layer}" for layer in stack_class.DEPENDS_ON)))
+    return jobs
+
+
+def synth_layers(prefix: str, stack_args: dict, out: str = None, workers: int = None) -> list:
+    def progress(result, done, total):
+        sys.stderr.write(f"[{done}/{total}] {result['stack']} {result['seconds']:.1f}s\n")
+
+    return synth_all(layer_jobs(prefix, **stack_args), out or outdir(), workers=workers, progress=progress)
+
+
+if __name__ == "__main__":
+    from main import STACK_ARGS, STACK_ID
+
+    synth_layers(STACK_ID, STACK_ARGS, workers=int(os.environ.get("SYNTH_WORKERS", 0)) or None)
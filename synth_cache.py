@@ -0,0 +1,199 @@
+"""Content-addressed cache for synthesized stacks.
+
+The key covers everything that can change the synthesized output: the
+project's Python sources, the stack constructor arguments, the pinned
+cdktf/provider versions from ``Pipfile.lock``, ``cdktf.json``, the generated
+bindings and the environment variables cdktf reads at synth time (``cdktf
+synth --hcl`` sets ``SYNTH_HCL_OUTPUT``, for instance). An entry holds the
+manifest and, for each stack, the document its ``synthesizedStackPath``
+names plus the other files synthesized next to it. A hit copies them back
+into the outdir without importing cdktf, so the jsii kernel never starts.
+
+    python synth_cache.py stats    print hit/miss counters
+    python synth_cache.py clear    drop every cached entry
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("SYNTH_CACHE_DIR", os.path.join(PROJECT_ROOT, ".synth-cache"))
+MAX_ENTRIES = 20
+ASSETS = "assets"  # TerraformAsset copies into <working directory>/assets
+
+LOCKED_PACKAGES = ("cdktf", "cdktf-cdktf-provider-aws", "constructs", "jsii")
+# Read by cdktf's App and TerraformStack; each changes what synth writes.
+SYNTH_ENV = ("SYNTH_HCL_OUTPUT", "CDKTF_CONTEXT_JSON", "CDKTF_TARGET_STACK_ID")
+
+
+def enabled() -> bool:
+    return os.environ.get("SYNTH_CACHE", "on").lower() not in ("0", "off", "false", "no")
+
+
+def outdir() -> str:
+    return os.environ.get("CDKTF_OUTDIR", os.path.join(PROJECT_ROOT, "cdktf.out"))
+
+
+def locked_versions(root: str = PROJECT_ROOT) -> dict:
+    try:
+        with open(os.path.join(root, "Pipfile.lock")) as f:
+            packages = json.load(f).get("default", {})
+    except FileNotFoundError:
+        return {}
+    return {name: packages.get(name, {}).get("version") for name in LOCKED_PACKAGES}
+
+
+def fingerprint(stacks: dict, root: str = PROJECT_ROOT, variant: str = "", env=None) -> str:
+    digest = hashlib.sha256()
+
+    def feed(label: str, data: bytes):
+        digest.update(label.encode() + b"\0" + hashlib.sha256(data).digest())
+
+    for path in sorted(glob.glob(os.path.join(root, "*.py"))):
+        if not path.endswith("-test.py"):
+            with open(path, "rb") as f:
+                feed(os.path.basename(path), f.read())
+    feed("stacks", json.dumps(stacks, sort_keys=True, default=str).encode())
+    feed("Pipfile.lock", json.dumps(locked_versions(root), sort_keys=True).encode())
+    with open(os.path.join(root, "cdktf.json"), "rb") as f:
+        feed("cdktf.json", f.read())
+    # The generated bindings carry the provider version in the name of their
+    # bundled jsii assembly; that is enough to notice a ``cdktf get`` upgrade.
+    assemblies = sorted(os.path.basename(p) for p in glob.glob(os.path.join(root, "imports", "*", "_jsii", "*.tgz")))
+    feed("imports", "\n".join(assemblies).encode())
+    env = os.environ if env is None else env
+    feed("env", json.dumps({name: env.get(name) for name in SYNTH_ENV}).encode())
+    if variant:
+        feed("variant", variant.encode())
+    return digest.hexdigest()
+
+
+class SynthCache:
+    def __init__(self, stacks: dict, out: str = None, cache_dir: str = CACHE_DIR, variant: str = ""):
+        self.stacks = stacks
+        self.out = out or outdir()
+        self.cache_dir = cache_dir
+        self.key = fingerprint(stacks, variant=variant)
+        self.entry = os.path.join(cache_dir, self.key)
+
+    def _files(self, root: str):
+        yield "manifest.json"
+        with open(os.path.join(root, "manifest.json")) as f:
+            manifest = json.load(f)
+        for stack in manifest.get("stacks", {}).values():
+            yield from synthesized_files(root, stack)
+
+    def restore(self) -> bool:
+        names = list(self._files(self.entry)) if os.path.exists(os.path.join(self.entry, "manifest.json")) else []
+        if not enabled() or not names or not all(os.path.exists(os.path.join(self.entry, name)) for name in names):
+            self._count("misses")
+            return False
+        self.clean()
+        for name in names:
+            target = os.path.join(self.out, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(os.path.join(self.entry, name), target)
+        os.utime(self.entry)
+        self._count("hits")
+        return True
+
+    def clean(self):
+        """Remove what the last synth into the outdir wrote.
+
+        cdktf overwrites only the files it writes, so a document left by a run
+        in another output mode (HCL, or a different stream_synth sharding)
+        would otherwise be stored or restored alongside the fresh one.
+        """
+        try:
+            with open(os.path.join(self.out, "manifest.json")) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        for stack in manifest.get("stacks", {}).values():
+            for name in list(synthesized_files(self.out, stack)):
+                if os.path.exists(os.path.join(self.out, name)):
+                    os.remove(os.path.join(self.out, name))
+            shutil.rmtree(os.path.join(self.out, stack["workingDirectory"], ASSETS), ignore_errors=True)
+
+    def store(self):
+        if not enabled():
+            return
+        staging = f"{self.entry}.{os.getpid()}.tmp"
+        for name in self._files(self.out):
+            target = os.path.join(staging, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(os.path.join(self.out, name), target)
+        shutil.rmtree(self.entry, ignore_errors=True)
+        os.replace(staging, self.entry)
+        prune(self.cache_dir)
+
+    def _count(self, field: str):
+        stats = read_stats(self.cache_dir)
+        stats[field] += 1
+        stats["last"] = {"key": self.key, "hit": field == "hits", "at": time.time()}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, "stats.json"), "w") as f:
+            json.dump(stats, f, indent=2)
+
+
+def synthesized_files(root: str, stack: dict):
+    """Paths, relative to ``root``, of what synth wrote for one manifest entry.
+
+    That is the document ``synthesizedStackPath`` names, the metadata written
+    beside an HCL document, stream_synth's shards and the stack's assets; the
+    working directory also holds ``.terraform/`` and state files, which are
+    not synthesized and stay out of the cache.
+    """
+    directory = stack["workingDirectory"]
+    yield stack["synthesizedStackPath"]
+    metadata = stack.get("stackMetadataPath")
+    if metadata and os.path.exists(os.path.join(root, metadata)):
+        yield metadata
+    shards = glob.glob(os.path.join(root, directory, "*.tf.json")) + glob.glob(os.path.join(root, directory, "*.tf"))
+    for path in sorted(shards):
+        if os.path.relpath(path, root) != os.path.normpath(stack["synthesizedStackPath"]):
+            yield os.path.relpath(path, root)
+    for parent, _, names in sorted(os.walk(os.path.join(root, directory, ASSETS))):
+        for name in sorted(names):
+            yield os.path.relpath(os.path.join(parent, name), root)
+
+
+def entries(cache_dir: str = CACHE_DIR):
+    if not os.path.isdir(cache_dir):
+        return []
+    paths = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)]
+    return sorted((p for p in paths if os.path.isdir(p) and not p.endswith(".tmp")), key=os.path.getmtime)
+
+
+def prune(cache_dir: str = CACHE_DIR, keep: int = MAX_ENTRIES):
+    for path in entries(cache_dir)[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def clear(cache_dir: str = CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def read_stats(cache_dir: str = CACHE_DIR) -> dict:
+    try:
+        with open(os.path.join(cache_dir, "stats.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"hits": 0, "misses": 0}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        clear()
+    elif command == "stats":
+        stats = read_stats()
+        total = stats["hits"] + stats["misses"]
+        rate = 100 * stats["hits"] / total if total else 0.0
+        print(f"hits {stats['hits']}  misses {stats['misses']}  hit rate {rate:.0f}%  entries {len(entries())}")
+    else:
+        sys.exit(f"usage: {sys.argv[0]} [stats|clear]")
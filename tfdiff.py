@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""Offline diff of two synth outputs, and the ``-target`` set to plan it.
+
+Each side is indexed by address (``aws_vpc.MyVpc``,
+``data.aws_iam_policy_document.assume_role``) with a content hash of every
+block and of each of its top-level arguments. Comparing two indexes yields
+the added, removed and changed blocks, and which arguments changed.
+
+For a scoped plan, every changed, added or removed address is a target,
+along with everything in the new config that depends on one of them
+through a reference or ``depends_on``. Terraform pulls in a target's
+dependencies on its own, so targets that are already a dependency of
+another target are dropped from the list. Changes outside ``resource``
+and ``data`` (providers, backend, outputs, ...) need a full plan, and the
+report says so.
+
+    python tfdiff.py OLD NEW [--stack ID]
+
+OLD and NEW are cdktf outdirs, stack working directories or single
+``*.tf.json`` files. Sharded ``stream_synth`` output works too. Exits 1
+when anything differs, like diff(1).
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+import stream_synth
+from depgraph import Graph, stack_documents
+
+Entry = Tuple[str, Dict[str, str]]  # block hash, argument -> hash
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class Snapshot(NamedTuple):
+    entries: Dict[str, Entry]
+    graph: Graph
+    other: str  # hash of everything outside resource and data
+
+
+def snapshot(path: str) -> Snapshot:
+    paths = sorted(glob.glob(os.path.join(path, "*.tf.json"))) if os.path.isdir(path) else [path]
+    entries, blocks, other = {}, [], {}
+    for file in paths:
+        for section, type_name, name, body in stream_synth.read(file):
+            address = f"{'data.' if section == 'data' else ''}{type_name}.{name}"
+            entries[address] = (_digest(body), {key: _digest(value) for key, value in body.items()})
+            blocks.append((section, type_name, name, body))
+        # Whatever its name, any file can carry providers, backend or outputs.
+        with open(file) as f:
+            document = json.load(f)
+        for key, value in document.items():
+            if key not in ("//", *stream_synth.STREAMED):
+                other.setdefault(key, []).append(value)
+    return Snapshot(entries, Graph.from_blocks(blocks), _digest(other))
+
+
+class Diff(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    changed: Dict[str, List[str]]  # address -> changed, added or removed arguments
+    full_plan: bool
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.full_plan)
+
+
+def compare(old: Snapshot, new: Snapshot) -> Diff:
+    changed = {}
+    for address in sorted(old.entries.keys() & new.entries.keys()):
+        (before, before_args), (after, after_args) = old.entries[address], new.entries[address]
+        if before != after:
+            changed[address] = sorted(key for key in before_args.keys() | after_args.keys()
+                                      if before_args.get(key) != after_args.get(key))
+    return Diff(sorted(new.entries.keys() - old.entries.keys()), sorted(old.entries.keys() - new.entries.keys()),
+                changed, old.other != new.other)
+
+
+def targets(diff: Diff, new: Snapshot) -> List[str]:
+    graph = new.graph
+    dependents = {address: set() for address in graph.durations}
+    for address in graph.durations:
+        for dependency in graph.dependencies(address):
+            dependents[dependency].add(address)
+
+    selected, pending = set(), [*diff.added, *diff.changed]
+    while pending:
+        address = pending.pop()
+        if address not in selected:
+            selected.add(address)
+            pending.extend(dependents.get(address, ()))
+
+    def ancestors(address):
+        seen, stack = set(), [address]
+        while stack:
+            for dependency in graph.dependencies(stack.pop()):
+                if dependency not in seen:
+                    seen.add(dependency)
+                    stack.append(dependency)
+        return seen
+
+    implied = set().union(*(ancestors(address) for address in selected)) if selected else set()
+    # Removed blocks are only in state; targeting them plans their destroy.
+    return sorted((selected - implied) | set(diff.removed))
+
+
+def _stacks(path: str) -> Dict[str, str]:
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        return {name: os.path.dirname(file) for name, file in stack_documents(path).items()}
+    return {"": path}
+
+
+def report(name: str, diff: Diff, selected: List[str], stream=sys.stdout):
+    label = f"{name}: " if name else ""
+    if not diff:
+        stream.write(f"{label}no changes\n")
+        return
+    stream.write(f"{label}{len(diff.added)} to add, {len(diff.changed)} to change, {len(diff.removed)} to remove\n")
+    for address in diff.added:
+        stream.write(f"  + {address}\n")
+    for address, arguments in diff.changed.items():
+        stream.write(f"  ~ {address} ({', '.join(arguments)})\n")
+    for address in diff.removed:
+        stream.write(f"  - {address}\n")
+    if diff.full_plan:
+        stream.write("  providers, backend or outputs changed: run a full plan\n")
+    elif selected:
+        stream.write("  terraform plan " + " ".join(f"-target='{address}'" for address in selected) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="diff two synth outputs and print the -target set")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--stack", help="only this stack of a cdktf outdir")
+    args = parser.parse_args(argv)
+
+    old_stacks, new_stacks = _stacks(args.old), _stacks(args.new)
+    found = False
+    for name in sorted(old_stacks.keys() | new_stacks.keys()):
+        if args.stack and name != args.stack:
+            continue
+        if name not in old_stacks or name not in new_stacks:
+            sys.stdout.write(f"{name}: stack {'added' if name in new_stacks else 'removed'}\n")
+            found = True
+            continue
+        old, new = snapshot(old_stacks[name]), snapshot(new_stacks[name])
+        diff = compare(old, new)
+        report(name, diff, targets(diff, new))
+        found = found or bool(diff)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
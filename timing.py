@@ -0,0 +1,32 @@
+import sys
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    def __init__(self, started: float = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def split(self, phase: str, name: str, seconds: float):
+        # Move time measured inside ``phase`` into its own line, e.g. binding
+        # imports that happen lazily while constructs are being created.
+        seconds = min(seconds, self.phases.get(phase, 0.0))
+        self.phases[phase] = self.phases.get(phase, 0.0) - seconds
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def report(self, stream=sys.stderr):
+        total = time.perf_counter() - self.started
+        width = max([len(name) for name in self.phases] + [5])
+        for name, seconds in self.phases.items():
+            share = 100 * seconds / total if total else 0.0
+            stream.write(f"{name:<{width}}  {seconds * 1000:9.1f} ms  {share:5.1f}%\n")
+        stream.write(f"{'total':<{width}}  {total * 1000:9.1f} ms\n")